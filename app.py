@@ -1,23 +1,36 @@
+import os
+# Pas de parallélisme interne OpenMP/BLAS: capture, encodage, analyse et requêtes HTTP
+# tournent déjà sur leurs propres threads (à définir avant l'import de numpy/cv2)
+os.environ.setdefault('OMP_NUM_THREADS', '1')
+os.environ.setdefault('OPENBLAS_NUM_THREADS', '1')
 from flask import Flask, render_template, request, jsonify, Response
 from flask_cors import CORS
 import cv2
+import hashlib
+import itertools
 import threading
 import time
-import base64
 import json
-import os
 import logging
+import random
 import sys
 import re
+import select
 import socket
 import errno
+import gc
 import numpy as np
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from types import MappingProxyType
 from dotenv import load_dotenv
 from services.camera_service import CameraService
 from services.ai_service import AIService
 from services.mqtt_service import get_mqtt_instance, MQTTService
 from services.detection_service import DetectionService
 from services.ha_service import HAService
+from services.image_ops import downscale, encode_jpeg, jpeg_data_url, mean_abs_diff
 
 # Charger les variables d'environnement
 load_dotenv(override=True)  # Forcer le remplacement des variables d'environnement existantes
@@ -31,6 +44,21 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Pool de threads OpenCV (resize/imencode): 1 par défaut pour éviter la sur-souscription
+# avec les threads de capture, d'encodage et du serveur WSGI
+try:
+    cv2.setNumThreads(max(0, int(os.getenv('OPENCV_THREADS', '1'))))
+    cv2.setUseOptimized(True)
+except Exception as e:
+    logger.warning(f"Configuration des threads OpenCV impossible: {e}")
+
+# Keys that should not have their spaces converted by _sanitize_env_value
+_SANITIZE_EXEMPT_KEYS = frozenset({
+    'DEFAULT_RTSP_URL', 'LMSTUDIO_URL', 'OLLAMA_URL', 'OPENAI_API_KEY',
+    'MQTT_PASSWORD', 'RTSP_PASSWORD', 'HA_TOKEN', 'HA_BASE_URL'
+})
+_WHITESPACE_RE = re.compile(r"\s+")
+
 def _sanitize_env_value(value, key: str) -> str:
     """Normalize values written to .env to avoid spaces breaking Docker env parsing.
     - Trim whitespace
@@ -47,15 +75,9 @@ def _sanitize_env_value(value, key: str) -> str:
         if (v.startswith('"') and v.endswith('"')) or (v.startswith("'") and v.endswith("'")):
             v = v[1:-1]
 
-        # Keys that should not have their spaces converted
-        exempt_keys = {
-            'DEFAULT_RTSP_URL', 'LMSTUDIO_URL', 'OLLAMA_URL', 'OPENAI_API_KEY',
-            'MQTT_PASSWORD', 'RTSP_PASSWORD', 'HA_TOKEN', 'HA_BASE_URL'
-        }
-
-        if key not in exempt_keys:
+        if key not in _SANITIZE_EXEMPT_KEYS:
             # Collapse any whitespace (spaces, tabs) into single underscores
-            v = re.sub(r"\s+", "_", v)
+            v = _WHITESPACE_RE.sub("_", v)
 
         return v
     except Exception:
@@ -74,8 +96,8 @@ def is_running_in_docker() -> bool:
 
 def _wait_until_bind_possible(host: str, port: int, timeout: float = 10.0) -> bool:
     """Attend jusqu'à ce qu'un bind(host, port) soit possible (port vraiment libéré)."""
-    t0 = time.time()
-    while time.time() - t0 < timeout:
+    t0 = time.monotonic()
+    while time.monotonic() - t0 < timeout:
         s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         try:
             s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
@@ -90,6 +112,102 @@ def _wait_until_bind_possible(host: str, port: int, timeout: float = 10.0) -> bo
             time.sleep(0.2)
     return False
 
+def _wait_for_pid_exit(pid: int, timeout: float = 10.0) -> bool:
+    """Attend la fin du processus pid sans polling: pidfd (Linux 5.3+) lisible à sa terminaison.
+    Retourne False si le pidfd est indisponible (autre OS, noyau ancien) ou si le délai expire."""
+    if not hasattr(os, 'pidfd_open'):
+        return False
+    try:
+        fd = os.pidfd_open(pid)
+    except ProcessLookupError:
+        return True  # Déjà terminé
+    except OSError:
+        return False
+    try:
+        readable, _, _ = select.select([fd], [], [], timeout)
+        return bool(readable)
+    finally:
+        os.close(fd)
+
+def _set_thread_stack_size():
+    """Réduit la pile réservée par les threads Python créés ensuite (workers WSGI: un par spectateur MJPEG ou client SSE),
+    si WSGI_THREAD_STACK_KB est défini (Ko; absent ou 0 = défaut du système, souvent 8 Mo).
+    Réglage global au processus (threading.stack_size): retourne la taille précédente pour la restaurer une fois
+    les threads du serveur créés, None si rien n'a changé.
+    """
+    try:
+        stack_kb = int(os.getenv('WSGI_THREAD_STACK_KB') or '0')
+        if stack_kb > 0:
+            previous = threading.stack_size(stack_kb * 1024)
+            logger.debug(f"Pile des threads: {stack_kb} Ko")
+            return previous
+    except (ValueError, RuntimeError) as e:
+        logger.warning(f"WSGI_THREAD_STACK_KB ignoré: {e}")
+    return None
+
+# Serveur WSGI en cours (hors mode debug): permet de l'arrêter pour un redémarrage sur place
+_wsgi_server = None
+# Redémarrage demandé par /admin: le thread principal fait os.execv une fois le serveur arrêté
+_restart_in_place = False
+
+def _serve(host: str, port: int, debug: bool = False):
+    """Sert l'application avec le serveur WSGI choisi par WSGI_SERVER (auto | waitress | werkzeug).
+    En production, waitress (si installé) sert les flux longs (MJPEG, SSE) depuis un pool de threads borné;
+    sinon, repli sur le serveur Werkzeug intégré (un thread par requête).
+    """
+    global _wsgi_server
+    choice = os.getenv('WSGI_SERVER', 'auto').strip().lower()
+    if debug:
+        app.run(debug=True, host=host, port=port, threaded=True, use_reloader=False)
+        return
+    if choice in ('auto', 'waitress'):
+        try:
+            from waitress import create_server
+        except ImportError:
+            if choice == 'waitress':
+                logger.warning("WSGI_SERVER=waitress mais waitress n'est pas installé, repli sur Werkzeug")
+        else:
+            threads = int(os.getenv('WSGI_THREADS', '16'))
+            logger.info(f"Serveur WSGI: waitress ({threads} threads)")
+            # Pool de threads créé d'emblée: pile réduite pour ces seuls threads, puis taille précédente restaurée
+            previous_stack_size = _set_thread_stack_size()
+            try:
+                _wsgi_server = create_server(app, host=host, port=port, threads=threads, ident='IAction')
+            finally:
+                if previous_stack_size is not None:
+                    threading.stack_size(previous_stack_size)
+            try:
+                _wsgi_server.run()
+            finally:
+                _wsgi_server = None
+            return
+    from werkzeug.serving import make_server
+    # Werkzeug crée un thread par requête pendant toute sa durée de vie: la pile réduite reste globale
+    _set_thread_stack_size()
+    _wsgi_server = make_server(host, port, app, threaded=True)
+    logger.info(f"Serveur WSGI: Werkzeug (http://{host}:{port})")
+    try:
+        _wsgi_server.serve_forever()
+    finally:
+        _wsgi_server.server_close()
+        _wsgi_server = None
+
+def _stop_wsgi_server() -> bool:
+    """Demande l'arrêt du serveur WSGI: _serve() retourne une fois le port libéré.
+    Retourne False si aucun serveur n'est arrêtable (mode debug, serveur pas encore démarré).
+    """
+    server = _wsgi_server
+    if server is None:
+        return False
+    if hasattr(server, 'serve_forever'):
+        # Werkzeug (socketserver): attend la sortie de serve_forever (thread principal)
+        server.shutdown()
+    else:
+        # waitress: fermer toutes les connexions depuis sa propre boucle, qui se termine sans canal ouvert
+        from waitress import wasyncore
+        server.trigger.pull_trigger(lambda: wasyncore.close_all(server._map))
+    return True
+
 def _run_web_server_with_retry(host: str = '0.0.0.0', port: int = 5002, debug: bool = False, max_attempts: int = 8):
     """Lance Flask avec une stratégie de retry robuste si le port est encore occupé.
     - Pré-vérifie la disponibilité du port par un bind test.
@@ -124,7 +242,7 @@ def _run_web_server_with_retry(host: str = '0.0.0.0', port: int = 5002, debug: b
             pass
 
         try:
-            app.run(debug=debug, host=host, port=port, threaded=True, use_reloader=False)
+            _serve(host, port, debug)
             return
         except OSError as e:
             msg = str(e).lower()
@@ -177,36 +295,56 @@ def _wait_for_port_to_close(host: str, port: int, timeout: float = 10.0) -> bool
             return True
     return False
 
-def _delayed_self_restart(delay_sec: float = 0.3, shutdown_fn=None):
-    """Redémarrage robuste par sous-processus (tous environnements).
-    - Crée un sous-processus Python (avec IACTION_WAIT_FOR_PID)
-    - Arrête proprement le serveur actuel, cleanup, puis quitte le parent
-    - Le sous-processus attend que le port soit libéré avant de démarrer
-    """
+def _spawn_restart_process(args):
+    """Lance le nouveau processus (avec IACTION_WAIT_FOR_PID: il attend la libération du port), puis quitte"""
     try:
-        time.sleep(delay_sec)
-        args = _build_restart_args()
-        # Créer un sous-processus, arrêter proprement, puis quitter
+        env = os.environ.copy()
+        env['IACTION_WAIT_FOR_PID'] = str(os.getpid())
+        logger.info(f"🔁 Redémarrage via nouveau subprocess: {args}")
+        import subprocess
+        subprocess.Popen(args, close_fds=True, env=env)
+    except Exception as e:
+        logger.error(f"Échec du lancement du processus enfant: {e}")
+    finally:
         try:
-            env = os.environ.copy()
-            env['IACTION_WAIT_FOR_PID'] = str(os.getpid())
-            logger.info(f"🔁 Redémarrage via nouveau subprocess: {args}")
-            import subprocess
-            subprocess.Popen(args, close_fds=True, env=env)
-        except Exception as e:
-            logger.error(f"Échec du lancement du processus enfant: {e}")
-        finally:
-            if shutdown_fn:
-                try:
-                    logger.info("🛑 Arrêt du serveur en cours (shutdown werkzeug)...")
-                    shutdown_fn()
-                except Exception as e:
-                    logger.debug(f"shutdown werkzeug ignoré: {e}")
+            cleanup()
+        except Exception:
+            pass
+        os._exit(0)
+
+def _exec_restart():
+    """Redémarrage sur place, appelé par le thread principal une fois le serveur arrêté (port libéré):
+    cleanup puis os.execv dans le même processus (une seule initialisation de l'interpréteur)"""
+    args = _build_restart_args()
+    try:
+        cleanup()
+        logger.info(f"🔁 Redémarrage sur place (execv): {args}")
+        for stream in (sys.stdout, sys.stderr):
             try:
-                cleanup()
+                stream.flush()
             except Exception:
                 pass
-            os._exit(0)
+        os.execv(args[0], args)
+    except Exception as e:
+        logger.error(f"Échec du redémarrage sur place, repli sur un sous-processus: {e}")
+        _spawn_restart_process(args)
+
+def _delayed_self_restart(delay_sec: float = 0.3):
+    """Redémarrage robuste (tous environnements).
+    - Hors Docker, serveur WSGI arrêtable: arrêt du serveur, puis os.execv par le thread principal (_exec_restart)
+    - Sinon (Docker/PID 1, mode debug): sous-processus Python (avec IACTION_WAIT_FOR_PID)
+      qui attend la libération du port, puis sortie du parent
+    """
+    global _restart_in_place
+    try:
+        time.sleep(delay_sec)
+        if os.name == 'posix' and not is_running_in_docker():
+            _restart_in_place = True
+            if _stop_wsgi_server():
+                logger.info("🛑 Arrêt du serveur en cours avant redémarrage sur place...")
+                return
+            _restart_in_place = False
+        _spawn_restart_process(_build_restart_args())
     except Exception as e:
         logger.error(f"Erreur inattendue pendant le redémarrage différé: {e}")
         try:
@@ -215,16 +353,32 @@ def _delayed_self_restart(delay_sec: float = 0.3, shutdown_fn=None):
             pass
         os._exit(0)
 
-def resize_frame_for_analysis(frame):
-    """Redimensionne une frame en 720p pour l'analyse IA de manière centralisée"""
+# Taille maximale (plus grand côté) des images envoyées à l'IA: les modèles vision
+# redimensionnent de toute façon leurs entrées, inutile d'encoder plus de pixels
+ANALYSIS_MAX_SIDE = int(os.getenv('ANALYSIS_MAX_SIDE', '768'))
+# Qualité JPEG des images envoyées à l'IA: les modèles vision ignorent le détail fin, une image plus légère
+# raccourcit l'encodage, le base64 et l'envoi de la requête
+ANALYSIS_JPEG_QUALITY = min(100, max(1, int(os.getenv('ANALYSIS_JPEG_QUALITY') or '75')))
+# Différence moyenne (0-255) en dessous de laquelle la scène est jugée inchangée: analyse IA sautée (0 = désactivé)
+MOTION_THRESHOLD = float(os.getenv('MOTION_THRESHOLD', '2.0'))
+# Nombre maximal d'images envoyées en un seul appel IA (1 = une image par appel). Au-delà de 1, les images
+# prises pendant une analyse (espacées de MIN_ANALYSIS_INTERVAL) sont envoyées ensemble à l'appel suivant
+ANALYSIS_BATCH_FRAMES = max(1, int(os.getenv('ANALYSIS_BATCH_FRAMES') or '1'))
+
+def resize_frame_for_analysis(frame, dst=None):
+    """Réduit une frame (ratio conservé) à ANALYSIS_MAX_SIDE pour l'analyse IA de manière centralisée.
+    Si dst (tableau préalloué de la taille cible) est fourni, le résultat y est écrit directement.
+    """
     try:
         if frame is None:
             return None
-        # Vérifier si déjà en 720p pour éviter un redimensionnement inutile
+        # Ne jamais agrandir: si la frame est déjà assez petite, éviter un redimensionnement inutile
         height, width = frame.shape[:2]
-        if height == 720 and width == 1280:
+        scale = ANALYSIS_MAX_SIDE / float(max(height, width))
+        if scale >= 1.0:
             return frame
-        return cv2.resize(frame, (1280, 720), interpolation=cv2.INTER_AREA)
+        new_size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+        return downscale(frame, new_size, dst=dst)
     except Exception as e:
         logger.warning(f"Erreur lors du redimensionnement: {e}")
         return frame
@@ -232,6 +386,41 @@ def resize_frame_for_analysis(frame):
 app = Flask(__name__)
 CORS(app)
 
+# Sérialisation JSON via orjson (C) si disponible, avec repli sur le provider Flask par défaut
+try:
+    import orjson
+    from flask.json.provider import DefaultJSONProvider
+
+    class ORJSONProvider(DefaultJSONProvider):
+        def dumps(self, obj, **kwargs):
+            try:
+                return _json_bytes(obj).decode('utf-8')
+            except TypeError:
+                # Types non gérés par orjson (ex: Decimal): sérialiseur par défaut de Flask
+                return super().dumps(obj, **kwargs)
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+        def response(self, *args, **kwargs):
+            # Octets orjson passés tels quels à la réponse (pas d'aller-retour str -> UTF-8)
+            try:
+                body = _json_bytes(self._prepare_response_obj(args, kwargs))
+            except TypeError:
+                return super().response(*args, **kwargs)
+            return self._app.response_class(body, mimetype=self.mimetype)
+
+    def _json_bytes(obj):
+        """Sérialise obj en JSON (octets UTF-8)"""
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+    app.json = ORJSONProvider(app)
+    logger.info("Sérialisation JSON: orjson")
+except ImportError:
+    def _json_bytes(obj):
+        """Sérialise obj en JSON (octets UTF-8)"""
+        return json.dumps(obj).encode('utf-8')
+
 # Services globaux
 camera_service = CameraService()
 ai_service = AIService()
@@ -239,24 +428,79 @@ mqtt_service = get_mqtt_instance()  # Utiliser le singleton MQTT
 detection_service = DetectionService(ai_service, mqtt_service)
 
 # Variables globales
-current_frame = None
+# Pipeline: capture (décodage) -> encodeur JPEG (1 thread) -> clients /video_feed (frame_condition)
+#                              \-> analyseur IA (1 thread, _pending_frames)
+# Les étages se chevauchent. Entre eux, un slot "dernière frame gagnante" plutôt qu'une file bloquante:
+# un étage lent fait sauter des frames au lieu de retarder la capture (flux en direct, pas de retard accumulé).
 is_capturing = False
 capture_thread = None
-analysis_in_progress = False  # Indique si une analyse est en cours
-last_analysis_time = 0  # Timestamp de la dernière analyse terminée
-last_analysis_duration = 0  # Durée de la dernière analyse en secondes
-last_analysis_total_interval = 0  # Intervalle total entre deux réponses (fin -> fin)
+
+@dataclass(frozen=True, slots=True)
+class AnalysisStatus:
+    """Instantané immuable de l'état d'analyse: remplacé en bloc (affectation atomique), jamais modifié en place"""
+    last_time: float = 0  # Timestamp de la dernière analyse terminée
+    last_duration: float = 0  # Durée de la dernière analyse en secondes
+    total_interval: float = 0  # Intervalle total entre deux réponses (fin -> fin)
+    in_progress: bool = False  # Indique si une analyse est en cours
+
+analysis_status = AnalysisStatus()
 shutting_down = False  # Indicateur d'arrêt global
+# Double buffer préalloué: la capture décode dans le tampon arrière puis bascule l'index actif
+_frame_buffers = [None, None]
+_active_idx = 0
+_swap_lock = threading.Lock()
+# Dernière frame encodée en JPEG (une seule fois par frame), partagée par /video_feed et /api/current_frame
+current_jpeg_bytes = None
+current_jpeg_version = 0  # Incrémenté à chaque nouveau JPEG publié
+frame_condition = threading.Condition()  # Notifiée à chaque nouvelle frame publiée
+STREAM_JPEG_QUALITY = 80
+# Plus grand côté (px) de l'aperçu diffusé: le navigateur l'affiche rarement plus grand, l'encodage est proportionnel aux pixels
+STREAM_MAX_SIDE = int(os.getenv('STREAM_MAX_SIDE', '960'))
+# Encodage JPEG hors du thread de capture: un seul encodage en vol, les frames arrivant pendant sont ignorées
+_encode_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='jpeg-encoder')
+_encode_future = None
+_encoding_frame = None  # Tampon en cours d'encodage (ne doit pas être réécrit par la capture)
+# Frames en attente d'analyse: (frame, start_time), au plus ANALYSIS_BATCH_FRAMES. Avec 1, slot unique
+# "dernière frame gagnante": le producteur écrase, le consommateur vide
+_pending_frames = deque(maxlen=ANALYSIS_BATCH_FRAMES)
+_latest_condition = threading.Condition()
+_last_submit_time = 0.0  # Heure du dernier dépôt dans _pending_frames
+_analyzer = None  # Thread d'analyse persistant (un seul, jamais de thread par analyse)
+# Empreinte 16x16 de la dernière frame envoyée à l'analyse (référence pour détecter un changement de scène)
+_last_analyzed_thumb = None
+_analysis_buffer = None  # Tampon préalloué de l'image réduite envoyée à l'analyse (voir _snapshot_for_analysis)
+# Version de l'état (analyse/capture), incrémentée à chaque changement pour réveiller les flux SSE
+status_condition = threading.Condition()
+_status_version = 0
 # Compteur d'échecs IA consécutifs pour arrêt automatique
 ai_consecutive_failures = 0
+# Après un échec IA, pas de nouvelle analyse avant cet instant (time.time): backoff exponentiel à gigue complète
+_ai_retry_after = 0.0
+AI_BACKOFF_MAX = 16.0  # Attente maximale (s) entre deux tentatives: 1, 2, 4, 8 puis 16 s avant le 6e échec
+AI_MAX_CONSECUTIVE_FAILURES = 6  # Timeouts/erreurs réseau consécutifs avant arrêt de la capture (IA indisponible)
+AI_MAX_OTHER_FAILURES = 3  # Autres erreurs IA consécutives avant arrêt de la capture
+# Classification des erreurs IA (texte en minuscules): une seule passe en C par motif au lieu d'un test par mot-clé
+_AI_TIMEOUT_RE = re.compile(r'timeout|timed out|deadline exceeded')
+_AI_CONNECTION_ERROR_RE = re.compile(
+    r'connection error|connection refused|failed to establish a new connection|connection reset|bad gateway'
+    r'|service unavailable|host unreachable|network is unreachable|cannot connect|name or service not known|dns'
+)
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+# Corps JSON de /api/config (None: à reconstruire après un rechargement de la configuration)
+_config_body = None
+
 @app.route('/api/config')
 def get_config():
     """Expose la configuration nécessaire au frontend"""
+    global _config_body
+    # La configuration ne change qu'au rechargement du .env (/api/admin/reload): JSON sérialisé une seule fois
+    body = _config_body
+    if body is not None:
+        return Response(body, mimetype='application/json')
     config = {
         'rtsp_url': os.getenv('DEFAULT_RTSP_URL', ''),
         'capture_mode': os.getenv('CAPTURE_MODE', 'rtsp'),
@@ -265,7 +509,8 @@ def get_config():
         'ha_image_attr': os.getenv('HA_IMAGE_ATTR', 'entity_picture'),
         'ha_poll_interval': float(os.getenv('HA_POLL_INTERVAL', '1.0')),
     }
-    return jsonify(config)
+    body = _config_body = _json_bytes(config)
+    return Response(body, mimetype='application/json')
 
 @app.route('/api/cameras')
 def get_cameras():
@@ -291,8 +536,7 @@ def refresh_cameras():
     """Force la mise à jour de la liste des caméras"""
     try:
         # Effacer le cache
-        camera_service.cameras_cache = None
-        camera_service.cache_time = 0
+        camera_service.invalidate_cache()
         
         # Recharger les caméras
         cameras = camera_service.get_available_cameras()
@@ -302,7 +546,7 @@ def refresh_cameras():
             'message': 'Liste des caméras mise à jour',
             'cameras': cameras,
             'count': len(cameras),
-            'rtsp_count': len([c for c in cameras if c['type'] == 'rtsp'])
+            'rtsp_count': sum(1 for c in cameras if c['type'] == 'rtsp')
         })
     except Exception as e:
         logger.error(f"Erreur lors de la mise à jour des caméras: {e}")
@@ -332,66 +576,147 @@ def get_camera_info(camera_id):
             'error': str(e)
         }), 500
 
-# Variable pour suivre les requêtes /api/status
-status_request_count = 0
-last_status_log_time = 0
+# Compteur des requêtes /api/status (next() sur itertools.count est atomique sous le GIL)
+_status_requests = itertools.count()
 status_log_interval = 60  # Intervalle en secondes entre les logs de status
+# Timer qui journalise le compteur hors du chemin des requêtes (armé à la première requête)
+_status_log_timer = None
+_status_log_lock = threading.Lock()
+# Dernier corps JSON rendu pour /api/status, associé à l'instantané AnalysisStatus dont il provient
+_status_body_cache = (None, None)
+# Préfixe des ETag propre à ce processus: un compteur repartant de zéro après redémarrage ne valide pas un ancien cache
+_ETAG_PREFIX = f"{int(time.time()):x}-"
+
+def _not_modified(etag):
+    """Retourne une réponse 304 si le client possède déjà la représentation identifiée par etag, sinon None"""
+    if etag in request.if_none_match:
+        return _with_etag(Response(status=304), etag)
+    return None
+
+def _with_etag(response, etag):
+    """Ajoute l'ETag et impose une revalidation à chaque requête (le client réutilise sa copie sur 304)"""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def _schedule_status_log(start):
+    """Arme le prochain log du nombre de requêtes /api/status (start: valeur du compteur juste après le log précédent)"""
+    global _status_log_timer
+    _status_log_timer = threading.Timer(status_log_interval, _log_status_requests, args=(start,))
+    _status_log_timer.daemon = True
+    _status_log_timer.start()
+
+def _log_status_requests(start):
+    """Journalise périodiquement le nombre de requêtes /api/status reçues, puis se réarme"""
+    if shutting_down:
+        return
+    # Ce next() compte lui aussi: les requêtes reçues sont count - start
+    count = next(_status_requests)
+    if count > start:
+        logger.info(f"{count - start} requêtes /api/status reçues dans les {status_log_interval} dernières secondes")
+    _schedule_status_log(count + 1)
 
 @app.route('/api/status')
 def get_status():
     """Récupère les informations de statut de l'analyse"""
-    global last_analysis_time, last_analysis_duration, analysis_in_progress
-    global status_request_count, last_status_log_time
-    
-    # Incrémenter le compteur de requêtes
-    status_request_count += 1
-    current_time = time.time()
+    next(_status_requests)
+    if _status_log_timer is None:
+        with _status_log_lock:
+            if _status_log_timer is None:
+                _schedule_status_log(0)
     
-    # Ne logger que périodiquement pour éviter de surcharger les logs
-    if current_time - last_status_log_time > status_log_interval:
-        logger.info(f"{status_request_count} requêtes /api/status reçues dans les {status_log_interval} dernières secondes")
-        status_request_count = 0
-        last_status_log_time = current_time
-    
-    status = {
-        'last_analysis_time': last_analysis_time,
-        'last_analysis_duration': last_analysis_duration,
-        'analysis_in_progress': analysis_in_progress
-    }
+    # Le statut ne change qu'à la fin d'une analyse: réutiliser le JSON déjà sérialisé sinon
+    global _status_body_cache
+    st = analysis_status
+    etag = f"{_ETAG_PREFIX}s{st.last_time}-{int(st.in_progress)}"
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+    cached_status, body = _status_body_cache
+    if cached_status is not st or body is None:
+        status = {
+            'last_analysis_time': st.last_time,
+            'last_analysis_duration': st.last_duration,
+            'analysis_in_progress': st.in_progress
+        }
+        body = _json_bytes(status)
+        _status_body_cache = (st, body)
     
-    return jsonify(status)
+    return _with_etag(Response(body, mimetype='application/json'), etag)
 
 @app.route('/api/metrics')
 def get_metrics():
     """Endpoint léger pour les métriques de performance uniquement"""
-    global last_analysis_time, last_analysis_duration, last_analysis_total_interval
+    st = analysis_status
     
     # Calculer FPS dérivés
-    analysis_fps = (1.0 / last_analysis_duration) if last_analysis_duration and last_analysis_duration > 0 else 0
-    total_fps = (1.0 / last_analysis_total_interval) if last_analysis_total_interval and last_analysis_total_interval > 0 else 0
+    analysis_fps = (1.0 / st.last_duration) if st.last_duration and st.last_duration > 0 else 0
+    total_fps = (1.0 / st.total_interval) if st.total_interval and st.total_interval > 0 else 0
 
     return jsonify({
-        'last_analysis_time': last_analysis_time,
-        'last_analysis_duration': last_analysis_duration,
+        'last_analysis_time': st.last_time,
+        'last_analysis_duration': st.last_duration,
         'analysis_fps': analysis_fps,
-        'analysis_total_interval': last_analysis_total_interval,
+        'analysis_total_interval': st.total_interval,
         'analysis_total_fps': total_fps,
+        'dropped_frames': camera_service.dropped_frames,
         'timestamp': time.time()
     })
 
+def _notify_status_change():
+    """Signale un changement d'état aux clients de /api/status/stream"""
+    global _status_version
+    with status_condition:
+        _status_version += 1
+        status_condition.notify_all()
+
+def _status_payload():
+    """Etat poussé par /api/status/stream: métriques d'analyse + état de capture"""
+    st = analysis_status
+    analysis_fps = (1.0 / st.last_duration) if st.last_duration and st.last_duration > 0 else 0
+    total_fps = (1.0 / st.total_interval) if st.total_interval and st.total_interval > 0 else 0
+    return {
+        'last_analysis_time': st.last_time,
+        'last_analysis_duration': st.last_duration,
+        'analysis_fps': analysis_fps,
+        'analysis_total_interval': st.total_interval,
+        'analysis_total_fps': total_fps,
+        'analysis_in_progress': st.in_progress,
+        'is_capturing': is_capturing,
+        'timestamp': time.time()
+    }
+
+@app.route('/api/status/stream')
+def status_stream():
+    """Flux SSE: pousse l'état uniquement lorsqu'il change (remplace le polling de /api/metrics)"""
+    def generate():
+        last_version = None
+        while not shutting_down:
+            with status_condition:
+                if _status_version == last_version:
+                    status_condition.wait(timeout=15.0)
+                version = _status_version
+            if version == last_version:
+                # Commentaire SSE: maintient la connexion ouverte à travers les proxys
+                yield b": keepalive\n\n"
+                continue
+            last_version = version
+            yield b'data: ' + _json_bytes(_status_payload()) + b'\n\n'
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/capture_status')
 def get_capture_status():
     """Retourne l'état actuel de la capture"""
-    global is_capturing
     return jsonify({
         'is_capturing': is_capturing,
-        'camera_active': camera_service.is_capturing if hasattr(camera_service, 'is_capturing') else False
+        'camera_active': camera_service.is_capturing
     })
 
 @app.route('/api/start_capture', methods=['POST'])
 def start_capture():
     """Démarre la capture vidéo avec support amélioré"""
-    global is_capturing, capture_thread, ai_consecutive_failures
+    global is_capturing, capture_thread, ai_consecutive_failures, _ai_retry_after
     
     try:
         data = request.json
@@ -421,6 +746,7 @@ def start_capture():
             # Démarrer RTSP
             # Réinitialiser le compteur d'échecs IA au démarrage d'une nouvelle session
             ai_consecutive_failures = 0
+            _ai_retry_after = 0.0
             success = camera_service.start_capture(source, 'rtsp', rtsp_url)
             if not success:
                 return jsonify({'success': False, 'error': 'Impossible de démarrer la capture RTSP'}), 400
@@ -428,6 +754,7 @@ def start_capture():
             is_capturing = True
             capture_thread = threading.Thread(target=capture_loop, daemon=True)
             capture_thread.start()
+            _notify_status_change()
             # Publier l'état de capture (ON)
             try:
                 mqtt_service.publish_binary_sensor_state('capture_active', True)
@@ -448,9 +775,11 @@ def start_capture():
             
             # Réinitialiser le compteur d'échecs IA au démarrage d'une nouvelle session
             ai_consecutive_failures = 0
+            _ai_retry_after = 0.0
             is_capturing = True
             capture_thread = threading.Thread(target=ha_polling_loop, daemon=True)
             capture_thread.start()
+            _notify_status_change()
             # Publier l'état de capture (ON)
             try:
                 mqtt_service.publish_binary_sensor_state('capture_active', True)
@@ -475,6 +804,7 @@ def stop_capture():
     
     is_capturing = False
     camera_service.stop_capture()
+    _notify_status_change()
     # Publier l'état de capture (OFF)
     try:
         mqtt_service.publish_binary_sensor_state('capture_active', False)
@@ -486,7 +816,13 @@ def stop_capture():
 @app.route('/api/detections')
 def get_detections():
     """Récupère la liste des détections configurées"""
-    return jsonify(detection_service.get_detections())
+    # ETag dérivé du contenu: les compteurs de déclenchement évoluent aussi hors des POST/PUT/DELETE
+    body = _json_bytes(detection_service.get_detections())
+    etag = hashlib.blake2b(body, digest_size=8).hexdigest()
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+    return _with_etag(Response(body, mimetype='application/json'), etag)
 
 @app.route('/api/detections', methods=['POST'])
 def add_detection():
@@ -552,28 +888,64 @@ def delete_detection(detection_id):
     else:
         return jsonify({'error': 'Détection non trouvée'}), 404
 
+# Data URL de la dernière frame servie par /api/current_frame: (version JPEG, 'data:image/jpeg;base64,...')
+_b64_cache = (None, None)
+
 @app.route('/api/current_frame')
 def get_current_frame():
     """Récupère l'image actuelle"""
-    global current_frame
-    
-    if current_frame is None:
+    global _b64_cache
+    with frame_condition:
+        jpeg_bytes = current_jpeg_bytes
+        version = current_jpeg_version
+    if jpeg_bytes is None:
         return jsonify({'error': 'Aucune image disponible'}), 404
+    # ?format=jpeg: JPEG brut (utilisable en <img src>), sans base64 ni JSON
+    raw = request.args.get('format') == 'jpeg'
+    # Le client a déjà cette frame: 304 sans base64 ni corps
+    etag = f"{_ETAG_PREFIX}{'j' if raw else 'f'}{version}"
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+    if raw:
+        return _with_etag(Response(jpeg_bytes, mimetype='image/jpeg'), etag)
     
-    # Encoder l'image en base64
-    _, buffer = cv2.imencode('.jpg', current_frame)
-    img_base64 = base64.b64encode(buffer).decode('utf-8')
+    # Réutiliser le JPEG déjà encodé par la boucle de capture, et sa data URL tant que la frame n'a pas changé
+    cached_version, data_url = _b64_cache
+    if cached_version != version:
+        data_url = jpeg_data_url(jpeg_bytes)
+        _b64_cache = (version, data_url)
     
-    return jsonify({'image': f'data:image/jpeg;base64,{img_base64}'})
+    return _with_etag(jsonify({'image': data_url}), etag)
 
 # Variable pour suivre les connexions au flux vidéo
 video_feed_connections = 0
+# Instant (time.time) de la dernière connexion au flux, pour repérer les reconnexions rapides
+_last_video_feed_connection = 0.0
+# En-tête multipart MJPEG précalculé (Content-Length permet au navigateur de parser sans attendre la frontière)
+_MJPEG_PART_HEAD = b'--frame\r\nContent-Type: image/jpeg\r\nContent-Length: '
+# Intervalle (s) de répétition de la dernière frame quand la source n'en produit plus
+VIDEO_FEED_KEEPALIVE = 5.0
+# Sans spectateur du flux ni analyse due, la capture avance le flux sans convertir les frames en BGR,
+# hormis une frame publiée par intervalle (s) pour garder /api/current_frame à jour
+IDLE_PUBLISH_INTERVAL = 1.0
+# Dernière partie multipart complète (JPEG source, octets prêts à envoyer), construite une fois pour tous les clients
+_mjpeg_part_cache = (None, None)
+
+def _mjpeg_part(jpeg_bytes):
+    """Retourne la partie multipart MJPEG de ce JPEG, assemblée au plus une fois quel que soit le nombre de clients"""
+    global _mjpeg_part_cache
+    cached_jpeg, part = _mjpeg_part_cache
+    if cached_jpeg is not jpeg_bytes:
+        part = b''.join((_MJPEG_PART_HEAD, str(len(jpeg_bytes)).encode(), b'\r\n\r\n', jpeg_bytes, b'\r\n'))
+        _mjpeg_part_cache = (jpeg_bytes, part)
+    return part
 
 @app.route('/video_feed')
 def video_feed():
     """Stream vidéo en temps réel"""
     def generate():
-        global current_frame, video_feed_connections, shutting_down
+        global video_feed_connections, shutting_down, _last_video_feed_connection
         error_count = 0
         max_errors = 5
         
@@ -584,12 +956,14 @@ def video_feed():
         
         # Vérifier si c'est une reconnexion rapide (moins de 5 secondes depuis la dernière connexion)
         current_time = time.time()
-        if hasattr(app, 'last_video_feed_connection_time') and current_time - app.last_video_feed_connection_time < 5:
-            logger.info(f"Reconnexion rapide détectée (#{connection_id}) - Intervalle: {current_time - app.last_video_feed_connection_time:.2f}s")
+        if current_time - _last_video_feed_connection < 5:
+            logger.info(f"Reconnexion rapide détectée (#{connection_id}) - Intervalle: {current_time - _last_video_feed_connection:.2f}s")
         
         # Mettre à jour le temps de la dernière connexion
-        app.last_video_feed_connection_time = current_time
+        _last_video_feed_connection = current_time
         
+        last_version = 0  # Version 0 = aucune frame encodée: attendre la première
+        last_yield = time.monotonic()
         try:
             while True:
                 # Arrêt propre si shutdown demandé
@@ -597,18 +971,24 @@ def video_feed():
                     logger.info(f"Arrêt du flux vidéo (connexion #{connection_id}) - arrêt application en cours")
                     break
                 try:
-                    if current_frame is not None:
-                        # Convertir l'image en JPEG avec compression optimisée
-                        encode_params = [cv2.IMWRITE_JPEG_QUALITY, 85]  # Qualité optimisée
-                        success, buffer = cv2.imencode('.jpg', current_frame, encode_params)
-                        if success:
-                            frame = buffer.tobytes()
-                            yield (b'--frame\r\n'
-                                   b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-                            error_count = 0  # Réinitialiser le compteur d'erreurs
-                        else:
-                            logger.error("Erreur d'encodage de l'image")
-                            error_count += 1
+                    # Attendre la prochaine frame publiée (au plus 1s) au lieu d'un sleep fixe
+                    with frame_condition:
+                        if current_jpeg_version == last_version:
+                            frame_condition.wait(timeout=1.0)
+                        frame = current_jpeg_bytes
+                        version = current_jpeg_version
+                    if frame is not None:
+                        error_count = 0  # Réinitialiser le compteur d'erreurs
+                        now = time.monotonic()
+                        # Frame inchangée: ne rien renvoyer, sauf une répétition périodique qui sert de
+                        # keepalive et permet de détecter un client déconnecté
+                        if version == last_version and now - last_yield < VIDEO_FEED_KEEPALIVE:
+                            continue
+                        # JPEG encodé une seule fois par la capture et partie multipart assemblée une seule fois:
+                        # chaque client n'envoie que des octets partagés (une écriture, aucune copie par client)
+                        yield _mjpeg_part(frame)
+                        last_version = version
+                        last_yield = now
                     else:
                         logger.debug("Pas d'image disponible")
                         error_count += 1
@@ -617,21 +997,6 @@ def video_feed():
                     if error_count > max_errors:
                         logger.error(f"Trop d'erreurs dans le flux vidéo, arrêt du flux (connexion #{connection_id})")
                         break
-                        
-                    # Cadence du flux alignée sur la source si possible
-                    try:
-                        fps = camera_service.get_source_fps() if hasattr(camera_service, 'get_source_fps') else None
-                        if fps and fps > 0:
-                            interval = 1.0 / fps
-                        else:
-                            # Fallback: si mode HA polling actif, se caler sur l'intervalle de polling
-                            if os.getenv('CAPTURE_MODE', 'rtsp') == 'ha_polling':
-                                interval = max(float(os.getenv('HA_POLL_INTERVAL', '1.0')), 0.2)
-                            else:
-                                interval = 0.033
-                    except Exception:
-                        interval = 0.033
-                    time.sleep(interval)
                 except Exception as e:
                     logger.exception(f"Exception dans le flux vidéo: {e}")
                     error_count += 1
@@ -643,13 +1008,187 @@ def video_feed():
             # Décrémenter le compteur de connexions à la fermeture
             video_feed_connections -= 1
             logger.info(f"Flux vidéo fermé (connexion #{connection_id}) - Connexions actives: {video_feed_connections}")
-    # Retourner une réponse streaming MJPEG
+    # Retourner une réponse streaming MJPEG (parties déjà en octets: remises telles quelles au serveur WSGI)
     logger.info("Préparation de la réponse streaming MJPEG /video_feed")
-    return Response(generate(), mimetype='multipart/x-mixed-replace; boundary=frame')
+    return Response(generate(), mimetype='multipart/x-mixed-replace; boundary=frame', direct_passthrough=True)
+
+def publish_frame(frame, analysis_future=None):
+    """Publie une nouvelle frame et délègue son encodage JPEG (une seule fois pour tous les consommateurs).
+    Si l'encodeur est encore occupé, la frame n'est pas encodée: la latence prime sur le débit.
+    analysis_future (optionnel) reçoit l'image d'analyse dérivée de l'aperçu réduit (voir _encode_and_publish).
+    Retourne le Future de l'encodage de cette frame (résultat: octets JPEG ou None), ou None si elle n'est pas encodée.
+    """
+    global _encode_future, _encoding_frame
+    if _encode_future is not None and not _encode_future.done():
+        return None
+    _encoding_frame = frame
+    _encode_future = _encode_pool.submit(_encode_and_publish, frame, analysis_future)
+    return _encode_future
+
+def _encode_and_publish(frame, analysis_future=None):
+    """Encode la frame en JPEG et réveille les clients du flux.
+    Si analysis_future est fourni, l'image d'analyse est tirée de l'aperçu déjà réduit (nouvelle image,
+    indépendante du tampon de capture): un seul redimensionnement de la frame pleine pour les deux usages.
+    """
+    global current_jpeg_bytes, current_jpeg_version
+    try:
+        stream_frame = _resize_for_stream(frame)
+        if analysis_future is not None:
+            analysis_future.set_result(resize_frame_for_analysis(stream_frame))
+        jpeg_bytes = encode_jpeg(stream_frame, STREAM_JPEG_QUALITY)
+    except Exception as e:
+        if analysis_future is not None and not analysis_future.done():
+            analysis_future.set_exception(e)
+        logger.error(f"Erreur d'encodage de l'image: {e}")
+        return None
+    if jpeg_bytes is None:
+        logger.error("Erreur d'encodage de l'image")
+        return None
+    with frame_condition:
+        current_jpeg_bytes = jpeg_bytes
+        current_jpeg_version += 1
+        frame_condition.notify_all()
+    return jpeg_bytes
+
+def _resize_for_stream(frame):
+    """Réduit la frame à STREAM_MAX_SIDE pour l'aperçu (inchangée si déjà assez petite ou si STREAM_MAX_SIDE=0)"""
+    height, width = frame.shape[:2]
+    if STREAM_MAX_SIDE <= 0 or max(height, width) <= STREAM_MAX_SIDE:
+        return frame
+    scale = STREAM_MAX_SIDE / float(max(height, width))
+    new_size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+    return downscale(frame, new_size)
+
+def _publish_and_analyze(frame, analyze, start_time):
+    """Publie la frame pour le flux et, si analyze est vrai, la confie à l'analyse"""
+    # Aperçu réduit au moins à la taille d'analyse: l'image d'analyse en est dérivée par l'encodeur
+    from_stream = (analyze and 0 < STREAM_MAX_SIDE and ANALYSIS_MAX_SIDE <= STREAM_MAX_SIDE < max(frame.shape[:2]))
+    analysis_future = Future() if from_stream else None
+    encode_future = publish_frame(frame, analysis_future)
+    if not analyze:
+        return
+    if analysis_future is not None and encode_future is not None:
+        submit_for_analysis(analysis_future, start_time)
+    else:
+        submit_for_analysis(_analysis_input(frame, encode_future), start_time)
+
+def _analysis_input(frame, encode_future):
+    """Choisit ce qui est confié à l'analyse: le JPEG du flux s'il convient tel quel
+    (frame déjà à la taille d'analyse et même qualité JPEG), sinon une copie réduite de la frame.
+    """
+    if (encode_future is not None
+            and ANALYSIS_JPEG_QUALITY == STREAM_JPEG_QUALITY
+            and max(frame.shape[:2]) <= min(ANALYSIS_MAX_SIDE, STREAM_MAX_SIDE or ANALYSIS_MAX_SIDE)):
+        return encode_future
+    return _snapshot_for_analysis(frame)
+
+def _next_capture_buffer():
+    """Retourne le tampon arrière où décoder la prochaine frame (None s'il est encore en cours d'encodage)"""
+    back = _frame_buffers[1 - _active_idx]
+    if back is not None and back is _encoding_frame and _encode_future is not None and not _encode_future.done():
+        return None
+    return back
+
+def _swap_frame_buffer(frame):
+    """Enregistre la frame décodée comme tampon actif (le tampon précédent devient l'arrière)"""
+    global _active_idx
+    with _swap_lock:
+        back = 1 - _active_idx
+        _frame_buffers[back] = frame
+        _active_idx = back
+
+def _snapshot_for_analysis(frame):
+    """Prépare une copie privée, déjà réduite, de la frame pour le thread d'analyse.
+    Le tampon source sera réécrit par la capture: seule l'image réduite (bien plus petite) est conservée.
+    Sans lot, la copie est écrite dans un tampon unique réutilisé: les producteurs ne déposent une frame que lorsque
+    aucune analyse n'est en cours, le tampon n'est donc jamais réécrit pendant qu'il est analysé.
+    Avec un lot (ANALYSIS_BATCH_FRAMES > 1), plusieurs copies attendent ensemble: chacune a son propre tableau.
+    """
+    global _analysis_buffer
+    if ANALYSIS_BATCH_FRAMES > 1:
+        small = resize_frame_for_analysis(frame)
+        return small.copy() if small is frame else small
+    small = resize_frame_for_analysis(frame, dst=_analysis_buffer)
+    if small is frame:
+        buf = _analysis_buffer
+        if buf is None or buf.shape != frame.shape or buf.dtype != frame.dtype:
+            buf = np.empty_like(frame)
+        np.copyto(buf, frame)
+        small = buf
+    _analysis_buffer = small
+    return small
+
+def _analysis_due(st, current_time, min_interval):
+    """Indique si une frame peut être déposée pour l'analyse.
+    Hors analyse: dès que l'intervalle minimum depuis la dernière est écoulé. Pendant une analyse: uniquement
+    en mode lot, une frame par intervalle minimum, pour compléter le lot de l'appel suivant.
+    """
+    if current_time < _ai_retry_after:
+        return False
+    if not st.in_progress:
+        return (current_time - st.last_time) >= min_interval
+    return ANALYSIS_BATCH_FRAMES > 1 and (current_time - _last_submit_time) >= min_interval
+
+def submit_for_analysis(frame, start_time):
+    """Dépose une frame à analyser (au-delà de ANALYSIS_BATCH_FRAMES, la plus ancienne non consommée est écartée)
+    et réveille l'analyseur"""
+    global analysis_status, _last_submit_time
+    _start_analyzer()
+    with _latest_condition:
+        _pending_frames.append((frame, start_time))
+        _last_submit_time = start_time
+        analysis_status = replace(analysis_status, in_progress=True)
+        _latest_condition.notify()
+    _notify_status_change()
+
+def _scene_changed(frame):
+    """Indique si la frame diffère assez de la dernière analysée pour justifier un appel IA.
+    La comparaison se fait sur une empreinte 16x16 (moyenne par zone), peu sensible au bruit capteur.
+    """
+    global _last_analyzed_thumb
+    try:
+        # Échantillonnage bilinéaire 128x128 puis moyenne par zone: ~0.1 ms contre plusieurs ms en INTER_AREA direct
+        sampled = cv2.resize(frame, (128, 128), interpolation=cv2.INTER_LINEAR)
+        thumb = cv2.resize(sampled, (16, 16), interpolation=cv2.INTER_AREA)
+    except Exception as e:
+        logger.debug(f"Empreinte de frame impossible: {e}")
+        return True
+    prev = _last_analyzed_thumb
+    if MOTION_THRESHOLD > 0 and prev is not None and prev.shape == thumb.shape:
+        if mean_abs_diff(prev, thumb) < MOTION_THRESHOLD:
+            return False
+    _last_analyzed_thumb = thumb
+    return True
+
+def _start_analyzer():
+    """Démarre le thread d'analyse persistant s'il ne tourne pas déjà"""
+    global _analyzer
+    with _latest_condition:
+        if _analyzer is not None and _analyzer.is_alive():
+            return
+        _analyzer = threading.Thread(target=_analyzer_loop, name='analyzer', daemon=True)
+        _analyzer.start()
+
+def _analyzer_loop():
+    """Thread d'analyse unique: attend une frame dans le slot, l'analyse, puis recommence.
+    Un thread suffit (pas de processus): redimensionnement et encodage JPEG s'exécutent dans OpenCV/libjpeg-turbo
+    qui relâchent le GIL, et le reste de l'analyse est de l'attente réseau sur l'API IA.
+    """
+    while not shutting_down:
+        with _latest_condition:
+            while not _pending_frames and not shutting_down:
+                _latest_condition.wait(timeout=1.0)
+            items = list(_pending_frames)
+            _pending_frames.clear()
+        if len(items) == 1:
+            analyze_frame(*items[0])
+        elif items:
+            # Lot: images de la plus ancienne à la plus récente, durée mesurée depuis le dépôt de la dernière
+            analyze_frame([frame for frame, _ in items], items[-1][1])
 
 def ha_polling_loop():
     """Boucle de capture via Home Assistant en utilisant HAService."""
-    global current_frame, is_capturing, analysis_in_progress, last_analysis_time
+    global is_capturing
 
     base_url = os.getenv('HA_BASE_URL', '').rstrip('/')
     token = os.getenv('HA_TOKEN', '')
@@ -676,15 +1215,11 @@ def ha_polling_loop():
     )
 
     def on_frame(frame):
-        global current_frame, analysis_in_progress, last_analysis_time
-        # Publier la frame courante
-        current_frame = frame
-        # Déclencher analyse si intervalle OK
+        # Déclencher analyse si intervalle OK, puis publier la frame courante
         current_time = time.time()
-        if not analysis_in_progress and (current_time - last_analysis_time) >= min_analysis_interval:
-            analysis_thread = threading.Thread(target=analyze_frame, args=(frame.copy(), current_time), daemon=True)
-            analysis_thread.start()
-            analysis_in_progress = True
+        st = analysis_status
+        analyze = _analysis_due(st, current_time, min_analysis_interval) and _scene_changed(frame)
+        _publish_and_analyze(frame, analyze, current_time)
 
     def is_running():
         return is_capturing
@@ -692,96 +1227,156 @@ def ha_polling_loop():
     service.run_loop(on_frame, is_running)
 
 
+def _tune_capture_thread():
+    """Réglages optionnels du thread de capture (Linux): CAPTURE_CPU_AFFINITY=2 ou 2,3 épingle le thread
+    sur ces cœurs, CAPTURE_NICE=-5 ajuste sa priorité (valeur négative: droits root requis).
+    """
+    cpus = os.getenv('CAPTURE_CPU_AFFINITY', '').strip()
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        try:
+            # Sous Linux, pid 0 désigne le thread appelant uniquement
+            os.sched_setaffinity(0, {int(c) for c in cpus.split(',') if c.strip()})
+            logger.info(f"Thread de capture épinglé sur les CPU {cpus}")
+        except Exception as e:
+            logger.warning(f"CAPTURE_CPU_AFFINITY ignoré: {e}")
+    nice = os.getenv('CAPTURE_NICE', '').strip()
+    if nice and hasattr(os, 'setpriority') and hasattr(threading, 'get_native_id'):
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), int(nice))
+            logger.info(f"Priorité du thread de capture: nice={nice}")
+        except Exception as e:
+            logger.warning(f"CAPTURE_NICE ignoré: {e}")
+
 def capture_loop():
     """Boucle principale de capture RTSP"""
-    global current_frame, is_capturing, analysis_in_progress, last_analysis_time, last_analysis_duration
+    global is_capturing
     
+    _tune_capture_thread()
     min_analysis_interval = float(os.getenv('MIN_ANALYSIS_INTERVAL', '0.1'))
+    last_error_log = 0.0
+    next_motion_check = 0.0
+    next_idle_publish = 0.0
     
     while is_capturing:
         try:
-            frame = camera_service.get_frame()
-            if frame is not None:
-                current_frame = frame
-                # Déclencher l'analyse si l'intervalle minimum est respecté
-                current_time = time.time()
-                if not analysis_in_progress and (current_time - last_analysis_time) >= min_analysis_interval:
-                    analysis_thread = threading.Thread(target=analyze_frame, args=(frame.copy(), current_time), daemon=True)
-                    analysis_thread.start()
-                    analysis_in_progress = True
-
-            # Cadence alignée sur la source si possible
-            try:
-                fps = camera_service.get_source_fps() if hasattr(camera_service, 'get_source_fps') else None
-                interval = 1.0 / fps if fps and fps > 0 else 0.02
-            except Exception:
-                interval = 0.02
-            time.sleep(interval)
+            # Personne n'a besoin des pixels de cette frame: l'avancer sans conversion BGR (grab seul)
+            now = time.time()
+            if (video_feed_connections <= 0 and now < next_idle_publish
+                    and not (_analysis_due(analysis_status, now, min_analysis_interval) and now >= next_motion_check)):
+                if camera_service.skip_frame():
+                    continue
+            # Lecture bloquante jusqu'à l'arrivée de la frame suivante (la boucle suit la cadence de la source),
+            # décodée directement dans le tampon arrière (pas d'allocation par frame)
+            frame = camera_service.get_frame(dst=_next_capture_buffer())
+            if frame is None:
+                # Flux indisponible ou reconnexion différée: éviter de boucler à vide
+                time.sleep(0.05)
+                continue
+            _swap_frame_buffer(frame)
+            # Déclencher l'analyse si l'intervalle minimum est respecté
+            current_time = time.time()
+            next_idle_publish = current_time + IDLE_PUBLISH_INTERVAL
+            st = analysis_status
+            analyze = False
+            if _analysis_due(st, current_time, min_analysis_interval) and current_time >= next_motion_check:
+                # L'empreinte est calculée sur la frame pleine: l'image réduite n'est faite que si l'analyse a lieu
+                analyze = _scene_changed(frame)
+                if not analyze:
+                    # Scène statique: ne pas recomparer à chaque frame
+                    next_motion_check = current_time + min_analysis_interval
+            _publish_and_analyze(frame, analyze, current_time)
 
         except Exception as e:
-            logger.exception(f"Exception capture_loop: {e}")
+            # Un log par seconde au plus: une erreur répétée à chaque frame ne doit pas saturer la sortie
+            now = time.monotonic()
+            if now - last_error_log > 1.0:
+                last_error_log = now
+                logger.exception(f"Exception capture_loop: {e}")
             time.sleep(0.1)
 
 
+def _analysis_jpeg(frame):
+    """Retourne le JPEG à envoyer à l'IA pour un élément déposé par submit_for_analysis"""
+    if isinstance(frame, Future):
+        frame = frame.result()
+    if frame is None or isinstance(frame, bytes):
+        # JPEG déjà produit pour le flux vidéo (None: échec de l'encodage)
+        jpeg_bytes = frame
+        if jpeg_bytes is not None:
+            logger.debug(f"Analyse: JPEG du flux réutilisé sans réencodage ({len(jpeg_bytes)} octets)")
+    else:
+        # Réduire l'image avant encodage pour l'analyse
+        resized_frame = resize_frame_for_analysis(frame)
+
+        # Encoder l'image réduite en JPEG (le base64 n'est fait qu'à l'appel de l'API IA)
+        jpeg_bytes = encode_jpeg(resized_frame, ANALYSIS_JPEG_QUALITY)
+    if jpeg_bytes is None:
+        raise ValueError("Échec de l'encodage JPEG de l'image à analyser")
+    # L'API IA attend des octets: un Future non résolu ou un tableau ne doit jamais l'atteindre
+    if not isinstance(jpeg_bytes, bytes):
+        raise TypeError(f"JPEG d'analyse inattendu: {type(jpeg_bytes).__name__}")
+    return jpeg_bytes
+
 def analyze_frame(frame, start_time):
-    """Analyse une image avec l'IA"""
-    global analysis_in_progress, last_analysis_time, last_analysis_duration, last_analysis_total_interval, is_capturing, ai_consecutive_failures
+    """Analyse une image avec l'IA.
+    frame: image BGR, ou Future de l'encodeur du flux: JPEG du flux réutilisé sans réencodage,
+    ou image d'analyse dérivée de l'aperçu réduit. Une liste de ces éléments est analysée en un seul appel.
+    """
+    global analysis_status, is_capturing, ai_consecutive_failures, _ai_retry_after
     
     try:
-        # Redimensionner l'image en 720p (1280x720) pour l'analyse
-        resized_frame = resize_frame_for_analysis(frame)
-
-        # Encoder l'image redimensionnée en base64
-        _, buffer = cv2.imencode('.jpg', resized_frame)
-        img_base64 = base64.b64encode(buffer).decode('utf-8')
+        if isinstance(frame, list):
+            jpeg_bytes = [_analysis_jpeg(f) for f in frame]
+        else:
+            jpeg_bytes = _analysis_jpeg(frame)
         
         # Analyser avec les détections configurées
-        result = detection_service.analyze_frame(img_base64)
+        result = detection_service.analyze_frame(jpeg_bytes)
 
         # Détecter erreurs IA (timeouts et erreurs de connexion) et arrêter si nécessaire
         try:
             if isinstance(result, dict):
-                err_text = (str(result.get('error', '')) + ' ' + str(result.get('details', ''))).lower()
                 success_flag = bool(result.get('success', True))
-
-                # Détection de timeout
-                is_timeout = (not success_flag) and any(
-                    kw in err_text for kw in ['timeout', 'timed out', 'read timed out', 'deadline exceeded']
-                )
-                # Détection d'erreurs de connexion/réseau
-                is_connection_error = (not success_flag) and any(
-                    kw in err_text for kw in [
-                        'connection error', 'connection refused', 'failed to establish a new connection',
-                        'connection reset', 'bad gateway', 'service unavailable', 'host unreachable',
-                        'network is unreachable', 'cannot connect', 'name or service not known', 'dns']
-                )
+                is_timeout = is_connection_error = False
+                if not success_flag:
+                    err_text = ' '.join(str(part) for part in (result.get('error'), result.get('details')) if part).lower()
+                    # Détection de timeout
+                    is_timeout = _AI_TIMEOUT_RE.search(err_text) is not None
+                    # Détection d'erreurs de connexion/réseau
+                    is_connection_error = _AI_CONNECTION_ERROR_RE.search(err_text) is not None
 
                 if success_flag:
                     # Reset sur succès
                     if ai_consecutive_failures:
                         logger.debug(f"Réinitialisation du compteur d'échecs IA ({ai_consecutive_failures} → 0)")
                     ai_consecutive_failures = 0
+                    _ai_retry_after = 0.0
                 else:
                     ai_consecutive_failures += 1
-                    logger.warning(f"Échec IA #{ai_consecutive_failures}: {err_text[:200]}")
-
-                # Arrêt immédiat sur timeout ou erreur de connexion
-                should_stop_now = is_timeout or is_connection_error
-                # Arrêt après N échecs consécutifs (N=3)
-                failure_threshold_reached = ai_consecutive_failures >= 3
-
-                if is_capturing and (should_stop_now or failure_threshold_reached):
-                    reason = 'timeout IA' if is_timeout else ('erreur de connexion IA' if is_connection_error else 'échecs IA répétés')
-                    logger.error(f"🛑 {reason} - arrêt de la capture")
-                    is_capturing = False
-                    try:
-                        camera_service.stop_capture()
-                    except Exception as e_stop:
-                        logger.warning(f"Erreur lors de l'arrêt de la capture après erreur IA: {e_stop}")
-                    try:
-                        mqtt_service.publish_binary_sensor_state('capture_active', False)
-                    except Exception:
-                        pass
+                    is_transient = is_timeout or is_connection_error
+                    # Arrêt après N échecs consécutifs: plus tolérant pour les timeouts/erreurs réseau, souvent passagers
+                    should_stop = ai_consecutive_failures >= (AI_MAX_CONSECUTIVE_FAILURES if is_transient else AI_MAX_OTHER_FAILURES)
+                    if is_transient and not should_stop:
+                        # Espacer les tentatives (gigue aléatoire pour ne pas relancer l'IA en rafale)
+                        backoff = random.uniform(0, min(AI_BACKOFF_MAX, 2 ** (ai_consecutive_failures - 1)))
+                        _ai_retry_after = time.time() + backoff
+                        reason = 'timeout' if is_timeout else 'erreur de connexion'
+                        logger.warning(f"Échec IA #{ai_consecutive_failures} ({reason}), nouvelle tentative dans {backoff:.1f}s: {err_text[:200]}")
+                    else:
+                        logger.warning(f"Échec IA #{ai_consecutive_failures}: {err_text[:200]}")
+                    if is_capturing and should_stop:
+                        reason = 'timeout IA' if is_timeout else ('erreur de connexion IA' if is_connection_error else 'échecs IA répétés')
+                        logger.error(f"🛑 {reason} ({ai_consecutive_failures} échecs consécutifs) - arrêt de la capture")
+                        is_capturing = False
+                        _ai_retry_after = 0.0
+                        try:
+                            camera_service.stop_capture()
+                        except Exception as e_stop:
+                            logger.warning(f"Erreur lors de l'arrêt de la capture après erreur IA: {e_stop}")
+                        try:
+                            mqtt_service.publish_binary_sensor_state('capture_active', False)
+                        except Exception:
+                            pass
         except Exception:
             # Ne pas bloquer l'analyse si la détection d'erreur échoue
             pass
@@ -789,95 +1384,150 @@ def analyze_frame(frame, start_time):
         # Calculer la durée de l'analyse
         end_time = time.time()
         duration = end_time - start_time
-        # Calculer l'intervalle total (fin -> fin) par rapport à l'analyse précédente
-        prev_end_time = last_analysis_time
-        total_interval = (end_time - prev_end_time) if prev_end_time and prev_end_time > 0 else 0
-        
-        # Mettre à jour les variables globales
-        last_analysis_time = end_time
-        last_analysis_duration = duration
-        last_analysis_total_interval = total_interval
+        # Publier le nouvel instantané d'état, sous le même verrou que les mises à jour de in_progress
+        # (submit_for_analysis, fin d'analyse): aucune lecture-modification-écriture ne se chevauche
+        with _latest_condition:
+            # Calculer l'intervalle total (fin -> fin) par rapport à l'analyse précédente
+            prev_end_time = analysis_status.last_time
+            total_interval = (end_time - prev_end_time) if prev_end_time and prev_end_time > 0 else 0
+            analysis_status = replace(analysis_status, last_time=end_time, last_duration=duration, total_interval=total_interval)
         
-        if total_interval and total_interval > 0:
-            logger.info(f"Analyse terminée en {duration:.2f}s | Intervalle total: {total_interval:.2f}s | FPS total: {1.0/total_interval:.2f}")
-        else:
-            logger.info(f"Analyse terminée en {duration:.2f}s")
+        # Message formaté seulement si INFO est actif (LOG_LEVEL=WARNING en production)
+        if logger.isEnabledFor(logging.INFO):
+            if total_interval and total_interval > 0:
+                logger.info(f"Analyse terminée en {duration:.2f}s | Intervalle total: {total_interval:.2f}s | FPS total: {1.0/total_interval:.2f}")
+            else:
+                logger.info(f"Analyse terminée en {duration:.2f}s")
         
-        # Publier les informations d'analyse via MQTT
-        mqtt_service.publish_status({
-            'last_analysis_time': last_analysis_time,
-            'last_analysis_duration': last_analysis_duration,
-            'analysis_total_interval': last_analysis_total_interval,
+        # Publier les informations d'analyse via MQTT (thread dédié: un broker lent ne retarde pas l'analyse suivante)
+        mqtt_service.publish_status_async({
+            'last_analysis_time': end_time,
+            'last_analysis_duration': duration,
+            'analysis_total_interval': total_interval,
             'analysis_result': result
         })
         
     except Exception as e:
         logger.error(f"Erreur lors de l'analyse: {e}")
         # Publier l'erreur via MQTT
-        mqtt_service.publish_status({
+        mqtt_service.publish_status_async({
             'last_analysis_time': time.time(),
             'last_analysis_duration': time.time() - start_time,
             'analysis_error': str(e),
             'analysis_result': None
         })
     finally:
-        # Marquer l'analyse comme terminée, qu'elle ait réussi ou échoué
-        analysis_in_progress = False
+        # Marquer l'analyse comme terminée, qu'elle ait réussi ou échoué (sauf si un lot attend déjà)
+        with _latest_condition:
+            analysis_status = replace(analysis_status, in_progress=bool(_pending_frames))
+        _notify_status_change()
 
 @app.route('/admin')
 def admin():
     """Page d'administration"""
     return render_template('admin.html')
 
+# Contenu analysé du .env: ((mtime_ns, taille) du fichier lu, dict clé -> valeur)
+_env_file_cache = (None, {})
+
+def _read_env_file(env_path='.env'):
+    """Retourne les paires clé/valeur du .env, relues uniquement si le fichier a changé (mtime/taille)"""
+    global _env_file_cache
+    try:
+        st = os.stat(env_path)
+    except OSError:
+        return {}
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached_stamp, values = _env_file_cache
+    if cached_stamp == stamp:
+        return values
+    # Lecture en un bloc puis décodage unique; le fichier peut avoir été supprimé depuis le stat
+    try:
+        with open(env_path, 'rb') as f:
+            data = f.read().decode('utf-8', 'replace')
+    except FileNotFoundError:
+        return {}
+    values = {}
+    for line in data.splitlines():
+        line = line.strip()
+        if line and not line.startswith('#') and '=' in line:
+            key, value = line.split('=', 1)
+            values[key] = value
+    _env_file_cache = (stamp, values)
+    return values
+
+def _write_env_file(content, env_path='.env'):
+    """Écrit le .env de façon atomique (fichier temporaire + os.replace), en conservant ses permissions.
+    Écriture en place seulement si le .env ne peut pas être remplacé (ex: fichier monté seul dans un conteneur)"""
+    global _env_file_cache
+    tmp_path = env_path + '.tmp'
+    try:
+        mode = os.stat(env_path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = None
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            # Permissions du .env (clés API, mots de passe MQTT) appliquées avant d'écrire le contenu
+            if mode is not None:
+                os.chmod(tmp_path, mode)
+            f.write(content)
+            # Contenu sur disque avant le renommage: une coupure ne laisse pas un .env vide
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, env_path)
+    except OSError as e:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        # Toute autre erreur (disque plein, lecture seule...) est remontée: réécrire en place corromprait le .env
+        if e.errno not in (errno.EXDEV, errno.EBUSY):
+            raise
+        logger.debug(f"Remplacement atomique du .env impossible ({e}), écriture en place")
+        with open(env_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+    _env_file_cache = (None, {})
+
+# Valeurs affichées par /admin pour les clés absentes du .env (lecture seule: partagée entre requêtes)
+_ADMIN_CONFIG_DEFAULTS = MappingProxyType({
+    'AI_API_MODE': 'lmstudio',
+    'AI_TIMEOUT': '10',
+    'LOG_LEVEL': 'INFO',
+    'OPENAI_MODEL': 'gpt-4-vision-preview',
+    'LMSTUDIO_URL': 'http://127.0.0.1:11434/v1',
+    'LMSTUDIO_MODEL': '',
+    'OLLAMA_URL': 'http://127.0.0.1:11434/v1',
+    'OLLAMA_MODEL': '',
+    'MQTT_BROKER': '127.0.0.1',
+    'MQTT_PORT': '1883',
+    'MQTT_USERNAME': '',
+    'MQTT_PASSWORD': '',
+    'HA_DEVICE_NAME': 'IAction',
+    'HA_DEVICE_ID': 'iaction_camera',
+    'DEFAULT_RTSP_URL': 'rtsp://localhost:554/live',
+    'RTSP_USERNAME': '',
+    'RTSP_PASSWORD': '',
+    'MIN_ANALYSIS_INTERVAL': '0.1',
+    'ANALYSIS_MAX_SIDE': '768',
+    'ANALYSIS_JPEG_QUALITY': '75',
+    'STREAM_MAX_SIDE': '960',
+    'MOTION_THRESHOLD': '2.0',
+    'ANALYSIS_BATCH_FRAMES': '1',
+    # Nouveau: capture mode & HA Polling
+    'CAPTURE_MODE': 'rtsp',
+    'HA_BASE_URL': '',
+    'HA_TOKEN': '',
+    'HA_ENTITY_ID': '',
+    'HA_IMAGE_ATTR': 'entity_picture',
+    'HA_POLL_INTERVAL': '1.0'
+})
+
 @app.route('/api/admin/config', methods=['GET'])
 def get_admin_config():
     """Récupère la configuration actuelle"""
     try:
-        config = {}
-        
-        # Lire le fichier .env
-        env_path = '.env'
-        if os.path.exists(env_path):
-            with open(env_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('#') and '=' in line:
-                        key, value = line.split('=', 1)
-                        config[key] = value
-        
-        # Ajouter les paramètres par défaut s'ils n'existent pas
-        defaults = {
-            'AI_API_MODE': 'lmstudio',
-            'AI_TIMEOUT': '10',
-            'LOG_LEVEL': 'INFO',
-            'OPENAI_MODEL': 'gpt-4-vision-preview',
-            'LMSTUDIO_URL': 'http://127.0.0.1:11434/v1',
-            'LMSTUDIO_MODEL': '',
-            'OLLAMA_URL': 'http://127.0.0.1:11434/v1',
-            'OLLAMA_MODEL': '',
-            'MQTT_BROKER': '127.0.0.1',
-            'MQTT_PORT': '1883',
-            'MQTT_USERNAME': '',
-            'MQTT_PASSWORD': '',
-            'HA_DEVICE_NAME': 'IAction',
-            'HA_DEVICE_ID': 'iaction_camera',
-            'DEFAULT_RTSP_URL': 'rtsp://localhost:554/live',
-            'RTSP_USERNAME': '',
-            'RTSP_PASSWORD': '',
-            'MIN_ANALYSIS_INTERVAL': '0.1',
-            # Nouveau: capture mode & HA Polling
-            'CAPTURE_MODE': 'rtsp',
-            'HA_BASE_URL': '',
-            'HA_TOKEN': '',
-            'HA_ENTITY_ID': '',
-            'HA_IMAGE_ATTR': 'entity_picture',
-            'HA_POLL_INTERVAL': '1.0'
-        }
-        
-        for key, default_value in defaults.items():
-            if key not in config:
-                config[key] = default_value
-        
+        # Lire le fichier .env (analyse mise en cache tant qu'il n'est pas modifié), complété par les défauts
+        config = {**_ADMIN_CONFIG_DEFAULTS, **_read_env_file()}
         return jsonify(config)
         
     except Exception as e:
@@ -886,13 +1536,23 @@ def get_admin_config():
             'error': f'Erreur lors de la lecture de la configuration: {str(e)}'
         }), 500
 
+# Dernier résultat du test IA: (instant time.monotonic, résultat). Des clics ou rafraîchissements rapprochés
+# de /admin réutilisent ce résultat au lieu de refaire un aller-retour vers le backend IA
+_ai_test_cache = (0.0, None)
+AI_TEST_CACHE_TTL = 2.0
+
 @app.route('/api/admin/ai_test', methods=['GET'])
 def admin_ai_test():
     """Teste la connexion au backend IA avec le modèle courant.
     Ne bloque pas le démarrage et retourne un JSON simple.
     """
+    global _ai_test_cache
     try:
-        result = ai_service.test_connection()
+        tested_at, result = _ai_test_cache
+        now = time.monotonic()
+        if result is None or now - tested_at >= AI_TEST_CACHE_TTL:
+            result = ai_service.test_connection()
+            _ai_test_cache = (time.monotonic(), result)
         return jsonify(result)
     except Exception as e:
         return jsonify({
@@ -913,11 +1573,7 @@ def admin_mqtt_test():
             # Tentative de connexion rapide (non bloquante)
             try:
                 mqtt_service.connect()
-                t0 = time.time()
-                while time.time() - t0 < 3:
-                    if getattr(mqtt_service, 'is_connected', False):
-                        break
-                    time.sleep(0.2)
+                mqtt_service.connected_event.wait(timeout=3)
                 status = mqtt_service.get_connection_status()
             except Exception:
                 pass
@@ -952,12 +1608,15 @@ def admin_rtsp_test():
 @app.route('/api/admin/reload', methods=['POST'])
 def admin_hot_reload():
     """Recharge la configuration (.env) et reconfigure les services sans redémarrer."""
+    global _config_body, _ai_test_cache
     try:
         # Recharger .env
         try:
             load_dotenv(override=True)
         except Exception:
             pass
+        _config_body = None
+        _ai_test_cache = (0.0, None)
 
         status = {}
 
@@ -1016,6 +1675,59 @@ def admin_hot_reload():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Disposition du .env écrit par /admin: (clé, défaut), ou (ligne de commentaire / vide, None)
+_ENV_FILE_LAYOUT = (
+    ("# Configuration IA", None),
+    ('AI_API_MODE', 'lmstudio'),
+    ('AI_TIMEOUT', '10'),
+    ("", None),
+    ("# Configuration Logs", None),
+    ('LOG_LEVEL', 'INFO'),
+    ("", None),
+    ("# Configuration OpenAI", None),
+    ('OPENAI_API_KEY', ''),
+    ('OPENAI_MODEL', 'gpt-4-vision-preview'),
+    ("", None),
+    ("# Configuration LM Studio", None),
+    ('LMSTUDIO_URL', 'http://127.0.0.1:11434/v1'),
+    ('LMSTUDIO_MODEL', ''),
+    ("", None),
+    ("# Configuration Ollama", None),
+    ('OLLAMA_URL', 'http://127.0.0.1:11434/v1'),
+    ('OLLAMA_MODEL', ''),
+    ("", None),
+    ("# Configuration MQTT", None),
+    ('MQTT_BROKER', '127.0.0.1'),
+    ('MQTT_PORT', '1883'),
+    ('MQTT_USERNAME', ''),
+    ('MQTT_PASSWORD', ''),
+    ("", None),
+    ("\n# Configuration Home Assistant", None),
+    ('HA_DEVICE_NAME', 'IAction'),
+    ('HA_DEVICE_ID', 'iaction_camera'),
+    ("", None),
+    ("\n# Configuration Caméra", None),
+    ('CAPTURE_MODE', 'rtsp'),
+    ('DEFAULT_RTSP_URL', ''),
+    ('RTSP_USERNAME', ''),
+    ('RTSP_PASSWORD', ''),
+    ("\n# Configuration HA Polling", None),
+    ('HA_BASE_URL', ''),
+    ('HA_TOKEN', ''),
+    ('HA_ENTITY_ID', ''),
+    ('HA_IMAGE_ATTR', 'entity_picture'),
+    ('HA_POLL_INTERVAL', '1.0'),
+    ("\n# Configuration Analyse", None),
+    ('MIN_ANALYSIS_INTERVAL', '0.1'),
+    ('ANALYSIS_MAX_SIDE', '768'),
+    ('STREAM_MAX_SIDE', '960'),
+    ('ANALYSIS_JPEG_QUALITY', '75'),
+    ('MOTION_THRESHOLD', '2.0'),
+    ('ANALYSIS_BATCH_FRAMES', '1'),
+)
+# Réglages sans champ dans le formulaire: conserver la valeur actuelle
+_ENV_FILE_KEEP_CURRENT = frozenset({'ANALYSIS_MAX_SIDE', 'STREAM_MAX_SIDE', 'ANALYSIS_JPEG_QUALITY'})
+
 @app.route('/api/admin/config', methods=['POST'])
 def save_admin_config():
     """Sauvegarde la configuration"""
@@ -1028,74 +1740,14 @@ def save_admin_config():
                 'error': 'Aucune configuration fournie'
             }), 400
         
-        # Construire le contenu du fichier .env
-        env_content = []
-        
-        # Configuration IA
-        env_content.append("# Configuration IA")
-        env_content.append(f"AI_API_MODE={_sanitize_env_value(config.get('AI_API_MODE', 'lmstudio'), 'AI_API_MODE')}")
-        env_content.append(f"AI_TIMEOUT={_sanitize_env_value(config.get('AI_TIMEOUT', '10'), 'AI_TIMEOUT')}")
-        env_content.append("")
-
-        # Configuration Logs
-        env_content.append("# Configuration Logs")
-        env_content.append(f"LOG_LEVEL={_sanitize_env_value(config.get('LOG_LEVEL', 'INFO'), 'LOG_LEVEL')}")
-        env_content.append("")
-        
-        # Configuration OpenAI
-        env_content.append("# Configuration OpenAI")
-        env_content.append(f"OPENAI_API_KEY={_sanitize_env_value(config.get('OPENAI_API_KEY', ''), 'OPENAI_API_KEY')}")
-        env_content.append(f"OPENAI_MODEL={_sanitize_env_value(config.get('OPENAI_MODEL', 'gpt-4-vision-preview'), 'OPENAI_MODEL')}")
-        env_content.append("")
-        
-        # Configuration LM Studio
-        env_content.append("# Configuration LM Studio")
-        env_content.append(f"LMSTUDIO_URL={_sanitize_env_value(config.get('LMSTUDIO_URL', 'http://127.0.0.1:11434/v1'), 'LMSTUDIO_URL')}")
-        env_content.append(f"LMSTUDIO_MODEL={_sanitize_env_value(config.get('LMSTUDIO_MODEL', ''), 'LMSTUDIO_MODEL')}")
-        env_content.append("")
-        
-        # Configuration Ollama
-        env_content.append("# Configuration Ollama")
-        env_content.append(f"OLLAMA_URL={_sanitize_env_value(config.get('OLLAMA_URL', 'http://127.0.0.1:11434/v1'), 'OLLAMA_URL')}")
-        env_content.append(f"OLLAMA_MODEL={_sanitize_env_value(config.get('OLLAMA_MODEL', ''), 'OLLAMA_MODEL')}")
-        env_content.append("")
-        
-        # Configuration MQTT
-        env_content.append("# Configuration MQTT")
-        env_content.append(f"MQTT_BROKER={_sanitize_env_value(config.get('MQTT_BROKER', '127.0.0.1'), 'MQTT_BROKER')}")
-        env_content.append(f"MQTT_PORT={_sanitize_env_value(config.get('MQTT_PORT', '1883'), 'MQTT_PORT')}")
-        env_content.append(f"MQTT_USERNAME={_sanitize_env_value(config.get('MQTT_USERNAME', ''), 'MQTT_USERNAME')}")
-        env_content.append(f"MQTT_PASSWORD={_sanitize_env_value(config.get('MQTT_PASSWORD', ''), 'MQTT_PASSWORD')}")
-        env_content.append("")
-        
-        # Configuration Home Assistant
-        env_content.append("\n# Configuration Home Assistant")
-        env_content.append(f"HA_DEVICE_NAME={_sanitize_env_value(config.get('HA_DEVICE_NAME', 'IAction'), 'HA_DEVICE_NAME')}")
-        env_content.append(f"HA_DEVICE_ID={_sanitize_env_value(config.get('HA_DEVICE_ID', 'iaction_camera'), 'HA_DEVICE_ID')}")
-        env_content.append("")
-        
-        # Configuration Caméra
-        env_content.append("\n# Configuration Caméra")
-        env_content.append(f"CAPTURE_MODE={_sanitize_env_value(config.get('CAPTURE_MODE', 'rtsp'), 'CAPTURE_MODE')}")
-        env_content.append(f"DEFAULT_RTSP_URL={_sanitize_env_value(config.get('DEFAULT_RTSP_URL', ''), 'DEFAULT_RTSP_URL')}")
-        env_content.append(f"RTSP_USERNAME={_sanitize_env_value(config.get('RTSP_USERNAME', ''), 'RTSP_USERNAME')}")
-        env_content.append(f"RTSP_PASSWORD={_sanitize_env_value(config.get('RTSP_PASSWORD', ''), 'RTSP_PASSWORD')}")
-
-        # Configuration HA Polling
-        env_content.append("\n# Configuration HA Polling")
-        env_content.append(f"HA_BASE_URL={_sanitize_env_value(config.get('HA_BASE_URL', ''), 'HA_BASE_URL')}")
-        env_content.append(f"HA_TOKEN={_sanitize_env_value(config.get('HA_TOKEN', ''), 'HA_TOKEN')}")
-        env_content.append(f"HA_ENTITY_ID={_sanitize_env_value(config.get('HA_ENTITY_ID', ''), 'HA_ENTITY_ID')}")
-        env_content.append(f"HA_IMAGE_ATTR={_sanitize_env_value(config.get('HA_IMAGE_ATTR', 'entity_picture'), 'HA_IMAGE_ATTR')}")
-        env_content.append(f"HA_POLL_INTERVAL={_sanitize_env_value(config.get('HA_POLL_INTERVAL', '1.0'), 'HA_POLL_INTERVAL')}")
-
-        # Configuration Analyse
-        env_content.append("\n# Configuration Analyse")
-        env_content.append(f"MIN_ANALYSIS_INTERVAL={_sanitize_env_value(config.get('MIN_ANALYSIS_INTERVAL', '0.1'), 'MIN_ANALYSIS_INTERVAL')}")
-
-        # Écrire le fichier .env
-        with open('.env', 'w', encoding='utf-8') as f:
-            f.write('\n'.join(env_content))
+        # Construire le contenu du fichier .env en une passe sur sa disposition.
+        env_content = [
+            key if default is None
+            else f"{key}={_sanitize_env_value(config.get(key, os.getenv(key, default) if key in _ENV_FILE_KEEP_CURRENT else default), key)}"
+            for key, default in _ENV_FILE_LAYOUT
+        ]
+
+        _write_env_file('\n'.join(env_content))
         
         return jsonify({
             'success': True,
@@ -1114,14 +1766,8 @@ def save_admin_config():
 def restart_app():
     """Redémarre l'application"""
     try:
-        # Récupérer la fonction shutdown du serveur pour libérer le port proprement
-        shutdown_fn = None
-        try:
-            shutdown_fn = request.environ.get('werkzeug.server.shutdown')
-        except Exception:
-            shutdown_fn = None
         # Démarrer un redémarrage différé pour que la réponse HTTP parte correctement
-        threading.Thread(target=_delayed_self_restart, kwargs={'delay_sec': 1.0, 'shutdown_fn': shutdown_fn}, daemon=True).start()
+        threading.Thread(target=_delayed_self_restart, kwargs={'delay_sec': 1.0}, daemon=True).start()
         return jsonify({'success': True, 'message': 'Redémarrage en cours (nouveau processus).'} )
         
     except Exception as e:
@@ -1159,10 +1805,20 @@ def cleanup():
     # Poser les flags d'arrêt
     shutting_down = True
     is_capturing = False
-    try:
-        camera_service.stop_capture()
-    except Exception as e:
-        logger.warning(f"Erreur lors de l'arrêt de la caméra: {e}")
+    # Réveiller tout de suite les threads en attente (analyseur, clients SSE et MJPEG) au lieu d'attendre leur timeout
+    for condition in (_latest_condition, status_condition, frame_condition):
+        with condition:
+            condition.notify_all()
+    # Arrêt caméra en parallèle de la séquence MQTT: il attend le verrou de capture, qu'une lecture RTSP
+    # bloquée peut garder plusieurs secondes
+    def _stop_camera():
+        try:
+            camera_service.stop_capture()
+        except Exception as e:
+            logger.warning(f"Erreur lors de l'arrêt de la caméra: {e}")
+    camera_stopper = threading.Thread(target=_stop_camera, name='cleanup-camera', daemon=True)
+    camera_deadline = time.monotonic() + 2.0
+    camera_stopper.start()
     try:
         # Publier l'état de capture (OFF) avant de se déconnecter
         mqtt_service.publish_binary_sensor_state('capture_active', False)
@@ -1172,6 +1828,9 @@ def cleanup():
         mqtt_service.disconnect()
     except Exception as e:
         logger.warning(f"Erreur lors de la déconnexion MQTT: {e}")
+    camera_stopper.join(timeout=max(0.0, camera_deadline - time.monotonic()))
+    if camera_stopper.is_alive():
+        logger.warning("Arrêt de la caméra toujours en cours après 2s, poursuite de l'arrêt")
 
 # Enregistrer la fonction de nettoyage pour qu'elle soit appelée à la fermeture
 import atexit
@@ -1199,10 +1858,13 @@ if __name__ == '__main__':
         # En cas d'échec, on poursuivra sans handler explicite
         pass
     logger.info("=== DÉMARRAGE IACTION ===")
+    _start_analyzer()
     # Si ce processus est lancé par un redémarrage, attendre la libération du port HTTP
     try:
         if os.environ.get('IACTION_WAIT_FOR_PID'):
             logger.info("⏳ Attente de la libération du port 5002 par l'ancien processus (bind test)...")
+            # Réveil dès la sortie de l'ancien processus; le test de bind ne sert plus qu'à confirmer
+            _wait_for_pid_exit(int(os.environ['IACTION_WAIT_FOR_PID']), timeout=10.0)
             _wait_until_bind_possible('0.0.0.0', 5002, timeout=10.0)
         os.environ.pop('IACTION_WAIT_FOR_PID', None)
     except Exception:
@@ -1217,23 +1879,21 @@ if __name__ == '__main__':
     max_wait = 10  # Attendre maximum 10 secondes
     wait_time = 0
     
-    while wait_time < max_wait:
-        if mqtt_service.is_connected:
-            logger.info("✅ MQTT: Connexion réussie au broker")
-            logger.info("✅ MQTT: Capteurs configurés pour Home Assistant")
-            # Reconfigurer les capteurs des détections après connexion MQTT
-            try:
-                if hasattr(detection_service, 'reconfigure_mqtt_sensors'):
-                    detection_service.reconfigure_mqtt_sensors()
-            except Exception as e:
-                logger.error(f"Erreur reconfiguration MQTT des détections: {e}")
-            break
-        time.sleep(1)
-        wait_time += 1
-        if wait_time % 3 == 0:
-            logger.info(f"⏳ MQTT: Tentative de connexion... ({wait_time}/{max_wait}s)")
+    # Réveil immédiat à la connexion (événement), avec un message de progression toutes les 3 s
+    while wait_time < max_wait and not mqtt_service.connected_event.wait(timeout=min(3, max_wait - wait_time)):
+        wait_time = min(max_wait, wait_time + 3)
+        logger.info(f"⏳ MQTT: Tentative de connexion... ({wait_time}/{max_wait}s)")
     
-    if not mqtt_service.is_connected:
+    if mqtt_service.is_connected:
+        logger.info("✅ MQTT: Connexion réussie au broker")
+        logger.info("✅ MQTT: Capteurs configurés pour Home Assistant")
+        # Reconfigurer les capteurs des détections après connexion MQTT
+        try:
+            if hasattr(detection_service, 'reconfigure_mqtt_sensors'):
+                detection_service.reconfigure_mqtt_sensors()
+        except Exception as e:
+            logger.error(f"Erreur reconfiguration MQTT des détections: {e}")
+    else:
         logger.error("❌ MQTT: Connexion échouée - Les capteurs ne seront pas disponibles")
         logger.error("   Vérifiez votre broker MQTT et votre configuration .env")
     
@@ -1246,6 +1906,10 @@ if __name__ == '__main__':
     os.environ.pop('WERKZEUG_RUN_MAIN', None)
     os.environ.pop('WERKZEUG_SERVER_FD', None)
 
+    # Objets de démarrage (modules, services, routes) vivants jusqu'à l'arrêt: les sortir du suivi du GC
+    # pour que les collectes déclenchées par les allocations du flux ne les reparcourent pas
+    gc.freeze()
+
     try:
         if debug_mode:
             logger.info("Mode: DEBUG")
@@ -1253,6 +1917,9 @@ if __name__ == '__main__':
         else:
             logger.info("Mode: PRODUCTION")
             _run_web_server_with_retry(host='0.0.0.0', port=5002, debug=False)
+        # Serveur arrêté pour un redémarrage demandé par /admin
+        if _restart_in_place:
+            _exec_restart()
     except KeyboardInterrupt:
         logger.info("KeyboardInterrupt reçu, arrêt en cours...")
         cleanup()
@@ -1,12 +1,12 @@
 import json
 import os
 import re
-import base64
-from typing import Dict, Any, List
-from openai import OpenAI
+from typing import Dict, Any, List, Union
 import logging
 from urllib.parse import urlparse, urlunparse
 
+from services.image_ops import jpeg_data_url
+
 logger = logging.getLogger(__name__)
 
 class AIService:
@@ -64,32 +64,19 @@ class AIService:
         if self.ollama_url != orig_ol:
             logger.info(f"Ollama URL normalisée → {self.ollama_url} (ajout auto de /v1)")
         
-        # Initialiser le client OpenAI approprié
+        # Le client OpenAI est créé au premier usage (voir la propriété client)
+        self._client = None
         if self.api_mode == 'lmstudio':
-            self.client = OpenAI(
-                base_url=self.lmstudio_url,
-                api_key="lm-studio",  # Valeur fictive mais requise
-                timeout=self.timeout
-            )
             self.model = self.lmstudio_model
             logger.info(
                 f"Configuration AI Service (LM Studio):\n - URL: {self.lmstudio_url}\n - Modèle: {self.model}\n - Timeout: {self.timeout}s"
             )
         elif self.api_mode == 'ollama':
-            self.client = OpenAI(
-                base_url=self.ollama_url,
-                api_key="ollama",  # Valeur fictive mais requise
-                timeout=self.timeout
-            )
             self.model = self.ollama_model
             logger.info(
                 f"Configuration AI Service (Ollama):\n - URL: {self.ollama_url}\n - Modèle: {self.model}\n - Timeout: {self.timeout}s"
             )
         else:  # mode 'openai' par défaut
-            self.client = OpenAI(
-                api_key=self.openai_api_key,
-                timeout=self.timeout
-            )
             self.model = self.openai_model
             logger.info(
                 f"Configuration AI Service (OpenAI):\n - Modèle: {self.model}\n - Timeout: {self.timeout}s"
@@ -97,6 +84,24 @@ class AIService:
         
         # Ne pas effectuer de requête réseau au démarrage pour éviter de bloquer l'application
         # Le support strict a été retiré; on fonctionne en mode JSON non strict par défaut
+
+    def _build_client(self):
+        """Crée le client compatible OpenAI du mode courant.
+        Le SDK n'est importé qu'ici: son import coûte plus d'une demi-seconde au démarrage.
+        """
+        from openai import OpenAI
+        if self.api_mode == 'lmstudio':
+            return OpenAI(base_url=self.lmstudio_url, api_key="lm-studio", timeout=self.timeout)  # Clé fictive mais requise
+        if self.api_mode == 'ollama':
+            return OpenAI(base_url=self.ollama_url, api_key="ollama", timeout=self.timeout)  # Clé fictive mais requise
+        return OpenAI(api_key=self.openai_api_key, timeout=self.timeout)
+
+    @property
+    def client(self):
+        """Client OpenAI, construit paresseusement au premier appel"""
+        if self._client is None:
+            self._client = self._build_client()
+        return self._client
     
     def reload_from_env(self):
         """Recharge la configuration AI depuis les variables d'environnement et réinitialise le client."""
@@ -142,16 +147,14 @@ class AIService:
 
         # Reconstruire le client
         try:
+            self._client = self._build_client()
             if self.api_mode == 'lmstudio':
-                self.client = OpenAI(base_url=self.lmstudio_url, api_key="lm-studio", timeout=self.timeout)
                 self.model = self.lmstudio_model
                 logger.info(f"AIService rechargé → LM Studio @ {self.lmstudio_url} • modèle={self.model}")
             elif self.api_mode == 'ollama':
-                self.client = OpenAI(base_url=self.ollama_url, api_key="ollama", timeout=self.timeout)
                 self.model = self.ollama_model
                 logger.info(f"AIService rechargé → Ollama @ {self.ollama_url} • modèle={self.model}")
             else:
-                self.client = OpenAI(api_key=self.openai_api_key, timeout=self.timeout)
                 self.model = self.openai_model
                 logger.info(f"AIService rechargé → OpenAI • modèle={self.model}")
             return True
@@ -231,11 +234,13 @@ class AIService:
                 return json.loads(json_match.group(0))
             raise
     
-    def analyze_image(self, image_base64: str, prompt: str) -> Dict[str, Any]:
-        """Analyse une image avec OpenAI ou LM Studio en utilisant l'API compatible OpenAI"""
+    def analyze_image(self, image_jpeg: Union[bytes, List[bytes]], prompt: str) -> Dict[str, Any]:
+        """Analyse une image (ou plusieurs, dans le même message) avec OpenAI ou LM Studio en utilisant l'API compatible OpenAI"""
         try:
-            # Préparer l'image pour l'API vision
-            image_content = f"data:image/jpeg;base64,{image_base64}"
+            # Préparer les images pour l'API vision (base64 uniquement ici, à la frontière HTTP)
+            images = image_jpeg if isinstance(image_jpeg, list) else [image_jpeg]
+            content = [{"type": "text", "text": prompt}]
+            content.extend({"type": "image_url", "image_url": {"url": jpeg_data_url(img)}} for img in images)
             
             api_name = self._get_api_name()
             logger.info(f"Envoi de la requête à {api_name} avec timeout de {self.timeout}s...")
@@ -246,12 +251,7 @@ class AIService:
                 response = self.client.chat.completions.create(
                     model=self.model,
                     messages=[
-                        {"role": "user", 
-                         "content": [
-                            {"type": "text", "text": prompt},
-                            {"type": "image_url", "image_url": {"url": image_content}}
-                         ]
-                        }
+                        {"role": "user", "content": content}
                     ],
                     max_tokens=500,
                     temperature=0,
@@ -263,12 +263,7 @@ class AIService:
                 response = self.client.chat.completions.create(
                     model=self.model,
                     messages=[
-                        {"role": "user", 
-                         "content": [
-                            {"type": "text", "text": prompt},
-                            {"type": "image_url", "image_url": {"url": image_content}}
-                         ]
-                        }
+                        {"role": "user", "content": content}
                     ],
                     max_tokens=500,
                     temperature=0
@@ -307,11 +302,11 @@ class AIService:
     
     # Les méthodes count_people et describe_scene ont été supprimées
     # car elles sont remplacées par la méthode analyze_combined qui regroupe tous les prompts en un seul
-    def analyze_combined(self, image_base64: str, detections: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def analyze_combined(self, image_jpeg: Union[bytes, List[bytes]], detections: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Analyse une image avec un prompt combiné pour tous les besoins d'analyse
         
         Args:
-            image_base64: Image en base64
+            image_jpeg: Image encodée en JPEG (octets bruts), ou liste de frames consécutives (plus ancienne en premier)
             detections: Liste des détections personnalisées à vérifier
             
         Returns:
@@ -322,9 +317,13 @@ class AIService:
         for i, detection in enumerate(detections):
             detection_prompts += f"\n{i+1}) {detection['phrase']}"
         
-        prompt = f"""Analyze this image.
-
-For each of the following detections, indicate if it matches the image.
+        if isinstance(image_jpeg, list) and len(image_jpeg) > 1:
+            intro = (f"Analyze these {len(image_jpeg)} images: consecutive frames from the same camera, oldest first.\n\n"
+                     "For each of the following detections, indicate if it matches in at least one of the images.")
+        else:
+            intro = "Analyze this image.\n\nFor each of the following detections, indicate if it matches the image."
+        
+        prompt = f"""{intro}
 
 Detections:{detection_prompts}
 
@@ -341,7 +340,7 @@ Rules:
 - Each result MUST be a boolean: true or false.
 """
         
-        result = self.analyze_image(image_base64, prompt)
+        result = self.analyze_image(image_jpeg, prompt)
         
         if result['success']:
             try:
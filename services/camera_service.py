@@ -2,14 +2,99 @@ import cv2
 import threading
 import time
 import os
-from PIL import Image
-import io
 from dotenv import load_dotenv
 from urllib.parse import urlparse
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Décodage RTSP via PyAV (FFmpeg, GIL relâché pendant le décodage) optionnel, avec repli sur OpenCV
+try:
+    import av
+except ImportError:
+    av = None
+
+
+class _PyAVCapture:
+    """Capture RTSP via PyAV exposant le sous-ensemble de cv2.VideoCapture utilisé par CameraService
+    (isOpened, grab, retrieve, read, get, set, release).
+    grab() décode la frame suivante sans conversion, retrieve() la convertit en BGR.
+    """
+
+    def __init__(self, url, timeout: float = 10.0):
+        self._container = None
+        self._pending = None
+        try:
+            self._container = av.open(url, options={'rtsp_transport': 'tcp', 'fflags': 'nobuffer', 'flags': 'low_delay'},
+                                      timeout=timeout)
+            self._stream = self._container.streams.video[0]
+            # Threads par tranche: parallélise le décodage d'une frame sans ajouter de frames de latence
+            self._stream.thread_type = 'SLICE'
+            self._frames = self._container.decode(self._stream)
+        except Exception as e:
+            logger.error(f"PyAV: ouverture du flux impossible: {e}")
+            self.release()
+
+    def isOpened(self):
+        return self._container is not None
+
+    def grab(self):
+        if self._container is None:
+            return False
+        try:
+            self._pending = next(self._frames)
+            return True
+        except StopIteration:
+            logger.warning("PyAV: fin du flux")
+        except Exception as e:
+            logger.warning(f"PyAV: lecture du flux interrompue: {e}")
+        self._pending = None
+        return False
+
+    def retrieve(self, dst=None):
+        """Convertit la dernière frame décodée en BGR (dst ignoré: PyAV alloue l'image convertie)"""
+        if self._pending is None:
+            return False, None
+        frame = self._pending.to_ndarray(format='bgr24')
+        self._pending = None
+        return True, frame
+
+    def read(self, dst=None):
+        if not self.grab():
+            return False, None
+        return self.retrieve(dst)
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS and self._container is not None:
+            rate = self._stream.average_rate or self._stream.guessed_rate
+            return float(rate) if rate else 0.0
+        return 0.0
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        container, self._container = self._container, None
+        self._pending = None
+        if container is not None:
+            try:
+                container.close()
+            except Exception:
+                pass
+
+
+def open_video_capture(url):
+    """Ouvre un flux vidéo avec le backend choisi par CAPTURE_BACKEND (auto | pyav | opencv).
+    auto: PyAV s'il est installé, sinon OpenCV (FFMPEG).
+    """
+    backend = os.getenv('CAPTURE_BACKEND', 'auto').strip().lower()
+    if backend in ('auto', 'pyav') and av is not None:
+        return _PyAVCapture(url)
+    if backend == 'pyav':
+        logger.warning("CAPTURE_BACKEND=pyav mais PyAV n'est pas installé, repli sur OpenCV")
+    return cv2.VideoCapture(url, cv2.CAP_FFMPEG)
+
+
 class CameraService:
     def __init__(self):
         self.cap = None
@@ -27,6 +112,8 @@ class CameraService:
         self.last_frame_ts = 0.0
         self.reconnect_attempts = 0
         self.next_reconnect_time = 0.0
+        self._last_read_error_log = 0.0
+        self.dropped_frames = 0  # Frames en retard écartées par le drainage du tampon RTSP
         
         load_dotenv()
         
@@ -43,6 +130,11 @@ class CameraService:
         
 
     
+    def invalidate_cache(self):
+        """Force le rechargement de la liste des caméras au prochain appel de get_available_cameras"""
+        self.cameras_cache = None
+        self.cache_time = 0
+
     def get_available_cameras(self):
         """Récupère les caméras RTSP disponibles"""
         if self.cameras_cache is not None and time.time() - self.cache_time < self.cache_duration:
@@ -103,7 +195,7 @@ class CameraService:
             return 'not_configured'
         
         try:
-            cap = cv2.VideoCapture(url)
+            cap = open_video_capture(url)
             cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
             
             if cap.isOpened():
@@ -160,6 +252,7 @@ class CameraService:
                 # Seul RTSP est supporté
                 source_type = 'rtsp'
                 logger.info(f"Démarrage de la capture RTSP - Source: {source}")
+                self.dropped_frames = 0
                 
                 if source_type == 'rtsp':
                     # Caméra RTSP
@@ -183,7 +276,7 @@ class CameraService:
                     logger.info(f"Ouverture du flux RTSP: {actual_url[:50]}...")
                     
                     # Configuration optimisée pour RTSP (FFMPEG)
-                    self.cap = cv2.VideoCapture(actual_url, cv2.CAP_FFMPEG)
+                    self.cap = open_video_capture(actual_url)
                     self.current_url = actual_url
                     
                     # Configuration RTSP spécifique pour latence minimale
@@ -255,8 +348,10 @@ class CameraService:
             self.reconnect_attempts = 0
             self.next_reconnect_time = 0.0
     
-    def get_frame(self):
-        """Récupère une image de la caméra avec gestion améliorée"""
+    def get_frame(self, dst=None):
+        """Récupère une image de la caméra avec gestion améliorée.
+        Si dst (tableau préalloué de même forme) est fourni, l'image y est décodée directement.
+        """
         with self.lock:
             if not self.is_capturing:
                 return None
@@ -283,13 +378,12 @@ class CameraService:
                         logger.warning(f"Aucune frame récente depuis {time.time() - self.last_frame_ts:.1f}s, tentative de reconnexion...")
                         return self._reconnect_camera()
 
-                # Pour RTSP, flush le buffer pour obtenir la frame la plus récente
+                # Pour RTSP, vider le retard accumulé pour obtenir la frame la plus récente:
+                # grab() avance sans conversion BGR ni copie, seule la dernière frame est récupérée (dans dst)
                 ret = False
                 frame = None
-                for _ in range(3):
-                    ret, frame = self.cap.read()
-                    if not ret:
-                        break
+                if self._drain_to_latest():
+                    ret, frame = self.cap.retrieve(dst)
 
                 if ret and frame is not None and frame.size > 0:
                     self.last_frame_ts = time.time()
@@ -300,7 +394,7 @@ class CameraService:
                     # Plusieurs tentatives avec délai
                     for _ in range(3):
                         time.sleep(0.1)
-                        ret, frame = self.cap.read()
+                        ret, frame = self.cap.read(dst)
                         if ret and frame is not None and frame.size > 0:
                             self.last_frame_ts = time.time()
                             self.reconnect_attempts = 0
@@ -315,12 +409,31 @@ class CameraService:
                     return None
 
             except Exception as e:
-                logger.exception(f"Exception lors de la lecture de la caméra: {e}")
                 now = time.time()
+                # Limiter la fréquence de ce log (il peut se produire à chaque frame)
+                if now - self._last_read_error_log > 1.0:
+                    self._last_read_error_log = now
+                    logger.exception(f"Exception lors de la lecture de la caméra: {e}")
                 if now >= self.next_reconnect_time:
                     return self._reconnect_camera()
                 return None
     
+    def skip_frame(self) -> bool:
+        """Avance le flux jusqu'à la frame la plus récente sans la convertir en BGR (grab seul).
+        Retourne False si rien n'a pu être lu: l'appelant se replie alors sur get_frame (reconnexion, watchdog).
+        """
+        with self.lock:
+            if not self.is_capturing or not self.cap:
+                return False
+            try:
+                if not self.cap.isOpened() or not self._drain_to_latest():
+                    return False
+            except Exception:
+                return False
+            self.last_frame_ts = time.time()
+            self.reconnect_attempts = 0
+            return True
+
     def _reconnect_camera(self):
         """Tente de reconnecter la caméra avec backoff exponentiel et URL exacte"""
         if not self.is_capturing:
@@ -341,7 +454,7 @@ class CameraService:
             last_err = None
             for i in range(max_tries):
                 logger.info(f"🔄 Reconnexion RTSP (tentative {i+1}/{max_tries}) vers {str(self.current_url)[:50]}...")
-                cap = cv2.VideoCapture(self.current_url, cv2.CAP_FFMPEG)
+                cap = open_video_capture(self.current_url)
                 if cap and cap.isOpened():
                     # Configurer: latence minimale sans forcer la résolution
                     cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
@@ -387,6 +500,26 @@ class CameraService:
         """Vérifie si la capture est active"""
         return self.is_capturing
 
+    def _drain_to_latest(self, max_drain: int = 30) -> bool:
+        """Avance le flux jusqu'à la frame la plus récente (grab sans décodage BGR).
+        Un grab qui revient presque immédiatement lisait une frame déjà en file: on continue.
+        Un grab qui a attendu vient de recevoir une frame fraîche: on s'arrête.
+        Retourne False si la lecture échoue.
+        """
+        fps = self.get_source_fps() or 25.0
+        fast = 0.25 / fps
+        dropped = -1
+        while dropped < max_drain:
+            t0 = time.monotonic()
+            if not self.cap.grab():
+                return False
+            dropped += 1
+            if time.monotonic() - t0 >= fast:
+                break
+        if dropped > 0:
+            self.dropped_frames += dropped
+        return True
+
     def get_source_fps(self):
         """Retourne le FPS de la source si disponible, sinon None"""
         try:
@@ -418,6 +551,5 @@ class CameraService:
             }
         ]
         # Invalider le cache des caméras pour forcer le recalcul
-        self.cameras_cache = None
-        self.cache_time = 0
+        self.invalidate_cache()
         logger.info("🔄 CameraService: configuration RTSP rechargée depuis .env (cache invalidé)")
@@ -3,7 +3,7 @@ import time
 import threading
 import json
 import os
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Union
 import logging
 import requests
 
@@ -115,8 +115,8 @@ class DetectionService:
             self.save_detections()
             return det.copy()
     
-    def analyze_frame(self, image_base64: str) -> dict:
-        """Analyse une image avec toutes les détections configurées
+    def analyze_frame(self, image_jpeg: Union[bytes, List[bytes]]) -> dict:
+        """Analyse une image JPEG (octets bruts), ou un lot de frames consécutives, avec toutes les détections configurées
         
         Returns:
             dict: Résultats de l'analyse avec la clé 'detections' uniquement
@@ -152,7 +152,7 @@ class DetectionService:
                 } for detection_id, detection in self.detections.items()]
             
             # Utiliser la méthode d'analyse combinée pour tout analyser en un seul appel
-            combined_results = self.ai_service.analyze_combined(image_base64, detections_list)
+            combined_results = self.ai_service.analyze_combined(image_jpeg, detections_list)
             
             if combined_results['success']:
                 # Traiter les résultats des détections personnalisées
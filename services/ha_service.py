@@ -9,6 +9,8 @@ import numpy as np
 import requests
 from urllib.parse import urlparse
 
+from services.image_ops import downscale
+
 
 class HAService:
     """
@@ -54,15 +56,16 @@ class HAService:
         ]
 
     def _resize_frame_for_analysis(self, frame):
-        """Redimensionne une frame en 720p pour l'analyse IA de manière centralisée"""
+        """Ramène une frame dans un cadre 1280x720 (ratio conservé) de manière centralisée"""
         try:
             if frame is None:
                 return None
-            # Vérifier si déjà en 720p pour éviter un redimensionnement inutile
+            # Ne jamais agrandir: une image qui tient déjà dans le cadre est transmise telle quelle
             height, width = frame.shape[:2]
-            if height == 720 and width == 1280:
+            scale = min(1280 / float(width), 720 / float(height))
+            if scale >= 1.0:
                 return frame
-            return cv2.resize(frame, (1280, 720), interpolation=cv2.INTER_AREA)
+            return downscale(frame, (max(1, int(round(width * scale))), max(1, int(round(height * scale)))))
         except Exception as e:
             self.logger.warning(f"Erreur lors du redimensionnement: {e}")
             return frame
@@ -89,7 +92,8 @@ class HAService:
         )
 
         while is_running_fn():
-            loop_start = time.time()
+            # Horloge monotone: la cadence ne saute pas si l'heure système est ajustée (NTP)
+            loop_start = time.monotonic()
             try:
                 self.logger.info(f"HA Polling: GET état -> {state_url}")
                 resp = self.session.get(state_url, headers=headers_json, timeout=self.state_timeout)
@@ -209,7 +213,7 @@ class HAService:
                 except Exception:
                     self.logger.info("HA Polling: dimensions image indisponibles")
 
-                # Normaliser en 1280x720 pour l'analyse
+                # Ramener dans un cadre 1280x720 (sans agrandir) pour l'analyse
                 frame = self._resize_frame_for_analysis(frame)
 
                 # Mettre à jour l'état de déduplication puis publier
@@ -226,9 +230,9 @@ class HAService:
 
     # Helpers
     def _remaining(self, loop_start: float) -> float:
-        elapsed = time.time() - loop_start
-        remaining = max(self.poll_interval - elapsed, 0.0)
-        return remaining if remaining > 0 else 0.0
+        """Temps restant avant le prochain tick: la durée de la requête est déduite de l'intervalle,
+        et un cycle en retard repart immédiatement sans cumuler d'attente"""
+        return max(self.poll_interval - (time.monotonic() - loop_start), 0.0)
 
     def _resolve_image_attr(self, attrs: dict):
         # valeur directe par nom
@@ -0,0 +1,76 @@
+import base64
+import logging
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+# Base64 SIMD (pybase64) optionnel, avec repli sur le module standard (même API)
+try:
+    import pybase64 as _base64
+except ImportError:
+    _base64 = base64
+
+# Encodeur GPU NVJPEG optionnel (PyNvJpeg): son initialisation échoue sans GPU CUDA utilisable
+try:
+    from nvjpeg import NvJpeg
+    _nvjpeg = NvJpeg()
+    logger.info("Encodage JPEG: NVJPEG (GPU)")
+except Exception:
+    _nvjpeg = None
+
+# Encodeur libjpeg-turbo (SIMD) optionnel, avec repli sur OpenCV si indisponible
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR, TJSAMP_420
+    _turbo = TurboJPEG()
+    logger.info("Encodage JPEG: libjpeg-turbo (PyTurboJPEG)")
+except Exception:
+    _turbo = None
+
+
+def encode_jpeg(frame, quality: int = 80) -> bytes:
+    """Encode une frame BGR en JPEG et retourne les octets (None en cas d'échec)"""
+    if _nvjpeg is not None:
+        try:
+            return _nvjpeg.encode(frame, quality)
+        except Exception as e:
+            logger.debug(f"Échec encodage NVJPEG, repli CPU: {e}")
+    if _turbo is not None:
+        try:
+            return _turbo.encode(frame, quality=quality, pixel_format=TJPF_BGR, jpeg_subsample=TJSAMP_420)
+        except Exception as e:
+            logger.debug(f"Échec encodage TurboJPEG, repli OpenCV: {e}")
+    success, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality, cv2.IMWRITE_JPEG_OPTIMIZE, 0, cv2.IMWRITE_JPEG_PROGRESSIVE, 0])
+    if not success:
+        return None
+    return buffer.tobytes()
+
+
+def mean_abs_diff(a, b) -> float:
+    """Différence absolue moyenne par canal (0-255) entre deux images de même forme et type"""
+    # Norme L1 calculée en C (SIMD) sans tableau intermédiaire
+    return cv2.norm(a, b, cv2.NORM_L1) / float(a.size)
+
+
+def downscale(frame, size, dst=None):
+    """Réduit une frame BGR à size=(largeur, hauteur), dans dst s'il est fourni et de la bonne forme.
+    INTER_AREA n'a de chemin rapide que pour un facteur entier: la réduction se fait d'abord d'un facteur
+    entier en INTER_AREA (anti-crénelage), puis le reste (moins de 2x) en bilinéaire.
+    """
+    height, width = frame.shape[:2]
+    factor = min(width // size[0], height // size[1])
+    if factor >= 2:
+        frame = cv2.resize(frame, (width // factor, height // factor), interpolation=cv2.INTER_AREA)
+    if frame.shape[1] == size[0] and frame.shape[0] == size[1]:
+        if dst is None or dst.shape != frame.shape or dst.dtype != frame.dtype:
+            return frame
+        dst[...] = frame
+        return dst
+    if dst is not None and dst.shape[:2] == (size[1], size[0]) and dst.dtype == frame.dtype:
+        return cv2.resize(frame, size, dst=dst, interpolation=cv2.INTER_LINEAR)
+    return cv2.resize(frame, size, interpolation=cv2.INTER_LINEAR)
+
+
+def jpeg_data_url(jpeg_bytes) -> str:
+    """Construit la data URL base64 d'un JPEG (format attendu par les API vision et par l'UI)"""
+    return 'data:image/jpeg;base64,' + _base64.b64encode(jpeg_bytes).decode('ascii')
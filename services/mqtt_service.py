@@ -1,11 +1,16 @@
 import os
 import json
+import queue
 import paho.mqtt.client as mqtt
 import time
 import sys
+import threading
 import atexit
+import logging
 from typing import Dict, Any
 
+logger = logging.getLogger(__name__)
+
 # Variable globale pour stocker l'instance unique du service MQTT
 _mqtt_instance = None
 
@@ -21,7 +26,7 @@ class MQTTService:
         # Vérifier si c'est la première instance
         global _mqtt_instance
         if _mqtt_instance is not None:
-            print("ATTENTION: Une nouvelle instance de MQTTService a été créée alors qu'une existe déjà!")
+            logger.warning("ATTENTION: Une nouvelle instance de MQTTService a été créée alors qu'une existe déjà!")
             # Fermer l'ancienne instance proprement
             _mqtt_instance.disconnect()
         
@@ -43,15 +48,17 @@ class MQTTService:
         
         self.device_name = os.getenv('HA_DEVICE_NAME', 'IAction Camera AI')
         self.device_id = os.getenv('HA_DEVICE_ID', 'iaction_camera_ai')
+        # Horodatage du dernier avertissement "pas connecté" (limité pour ne pas inonder les logs)
+        self._last_not_connected_log = 0.0
         
         # Afficher les valeurs exactes lues du fichier .env
-        print("=== Configuration MQTT chargée ===")
-        print(f"Broker: '{self.broker}'")
-        print(f"Port: {self.port}")
-        print(f"Username: '{self.username}'")
-        print(f"Password: '{'*' * len(self.password) if self.password else 'Non défini'}'")
-        print(f"Topic prefix: '{self.topic_prefix}'")
-        print("=================================")
+        logger.info("=== Configuration MQTT chargée ===")
+        logger.info(f"Broker: '{self.broker}'")
+        logger.info(f"Port: {self.port}")
+        logger.info(f"Username: '{self.username}'")
+        logger.info(f"Password: '{'*' * len(self.password) if self.password else 'Non défini'}'")
+        logger.info(f"Topic prefix: '{self.topic_prefix}'")
+        logger.info("=================================")
         
         # Utiliser un ID client fixe pour éviter les connexions multiples
         # Rendre l'ID client unique par processus pour éviter les collisions lors des redémarrages
@@ -62,11 +69,17 @@ class MQTTService:
         self.client_id = f"iaction_client_{self.device_id}_{pid}"
         self.client = None
         self.is_connected = False
+        # Signalé à chaque connexion réussie (permet d'attendre la connexion sans sonder is_connected)
+        self.connected_event = threading.Event()
         self.published_sensors = set()
         self.message_buffer = {}
         self.last_publish_time = 0
         self.publish_interval = 1.0  # Intervalle minimum entre les publications en secondes
         self._manual_disconnect = False
+        # Statuts d'analyse en attente de publication par un thread dédié (voir publish_status_async)
+        self._status_queue = queue.Queue(maxsize=64)
+        self._status_thread = None
+        self._status_thread_lock = threading.Lock()
 
     def reload_from_env(self):
         """Recharge la configuration MQTT depuis .env et reconnecte le client.
@@ -94,13 +107,13 @@ class MQTTService:
         self.device_id = os.getenv('HA_DEVICE_ID', 'iaction_camera_ai')
 
         # Afficher la configuration rechargée
-        print("=== Configuration MQTT rechargée ===")
-        print(f"Broker: '{self.broker}'")
-        print(f"Port: {self.port}")
-        print(f"Username: '{self.username}'")
-        print(f"Password: '{'*' * len(self.password) if self.password else 'Non défini'}'")
-        print(f"Topic prefix: '{self.topic_prefix}'")
-        print("===================================")
+        logger.info("=== Configuration MQTT rechargée ===")
+        logger.info(f"Broker: '{self.broker}'")
+        logger.info(f"Port: {self.port}")
+        logger.info(f"Username: '{self.username}'")
+        logger.info(f"Password: '{'*' * len(self.password) if self.password else 'Non défini'}'")
+        logger.info(f"Topic prefix: '{self.topic_prefix}'")
+        logger.info("===================================")
 
         # Réinitialiser le client et l'état de connexion, conserver published_sensors
         try:
@@ -110,13 +123,14 @@ class MQTTService:
         self.client_id = f"iaction_client_{self.device_id}_{pid}"
         self.client = None
         self.is_connected = False
+        self.connected_event.clear()
 
         # Reconnecter avec la nouvelle configuration
         return self.connect()
 
     def connect(self):
         """Établit la connexion au broker MQTT"""
-        print(f"Connexion à {self.broker}:{self.port} (client: {self.client_id})")
+        logger.info(f"Connexion à {self.broker}:{self.port} (client: {self.client_id})")
         
         self.client = mqtt.Client(client_id=self.client_id, protocol=mqtt.MQTTv311, clean_session=False)
         
@@ -138,7 +152,7 @@ class MQTTService:
             self.client.loop_start()
             return True
         except Exception as e:
-            print(f"❌ Erreur de connexion MQTT: {e}")
+            logger.error(f"❌ Erreur de connexion MQTT: {e}")
             return False
     
     def disconnect(self):
@@ -154,24 +168,26 @@ class MQTTService:
                     self.client.disconnect()
                     # Le callback _on_disconnect confirmera la déconnexion
             except Exception as e:
-                print(f"Erreur lors de la déconnexion MQTT: {e}")
+                logger.error(f"Erreur lors de la déconnexion MQTT: {e}")
             finally:
                 self.is_connected = False
+                self.connected_event.clear()
     
     def _on_connect(self, client, userdata, flags, rc):
         """Callback de connexion"""
         if rc == 0:
             self.is_connected = True
-            print("✅ MQTT: Connecté avec succès")
+            self.connected_event.set()
+            logger.info("✅ MQTT: Connecté avec succès")
             
             # Vérifier si c'est une reconnexion ou une première connexion
             if not hasattr(self, '_initial_setup_done') or not self._initial_setup_done:
-                print("⚙️  MQTT: Configuration des capteurs...")
+                logger.info("⚙️  MQTT: Configuration des capteurs...")
                 self._setup_fixed_sensors()
                 self._initial_setup_done = True
-                print("✅ MQTT: Capteurs configurés")
+                logger.info("✅ MQTT: Capteurs configurés")
             else:
-                print("🔄 MQTT: Reconnecté - capteurs déjà configurés")
+                logger.info("🔄 MQTT: Reconnecté - capteurs déjà configurés")
         else:
             error_messages = {
                 1: "Protocole incorrect",
@@ -181,26 +197,27 @@ class MQTTService:
                 5: "Non autorisé - Vérifiez vos identifiants MQTT"
             }
             error_msg = error_messages.get(rc, f"Erreur inconnue: {rc}")
-            print(f"Échec de connexion MQTT, code: {rc} - {error_msg}")
-            print(f"Tentative de connexion à {self.broker}:{self.port} avec utilisateur '{self.username}'")
-            print(f"Flags de connexion: {flags}")
+            logger.error(f"Échec de connexion MQTT, code: {rc} - {error_msg}")
+            logger.warning(f"Tentative de connexion à {self.broker}:{self.port} avec utilisateur '{self.username}'")
+            logger.warning(f"Flags de connexion: {flags}")
             # Essayer de se reconnecter avec un délai
             if not self.is_connected:
-                print("Nouvelle tentative de connexion dans 5 secondes...")
+                logger.warning("Nouvelle tentative de connexion dans 5 secondes...")
                 time.sleep(5)
                 try:
                     self.connect()
                 except Exception as e:
-                    print(f"Erreur lors de la tentative de reconnexion: {e}")
+                    logger.error(f"Erreur lors de la tentative de reconnexion: {e}")
     
     def _on_disconnect(self, client, userdata, rc):
         """Callback de déconnexion"""
         self.is_connected = False
+        self.connected_event.clear()
         # rc == 0 -> déconnexion propre ; sinon déconnexion inattendue
         if getattr(self, '_manual_disconnect', False) or rc == 0:
-            print("Déconnexion propre du broker MQTT")
+            logger.info("Déconnexion propre du broker MQTT")
         else:
-            print("⚠️  MQTT: Déconnecté du broker (perte de connexion)")
+            logger.warning("⚠️  MQTT: Déconnecté du broker (perte de connexion)")
         # Réinitialiser le flag manuel pour les prochaines fois
         self._manual_disconnect = False
     
@@ -290,10 +307,10 @@ class MQTTService:
         try:
             self.client.publish(config_topic, json.dumps(config_payload), retain=True)
             self.published_sensors.add(sensor_id)
-            print(f"Capteur configuré: {name}")
+            logger.debug(f"Capteur configuré: {name}")
             return True
         except Exception as e:
-            print(f"Erreur lors de la configuration du capteur {sensor_id}: {e}")
+            logger.error(f"Erreur lors de la configuration du capteur {sensor_id}: {e}")
             return False
     
     def setup_binary_sensor(self, sensor_id: str, name: str, device_class: str = "motion"):
@@ -323,10 +340,10 @@ class MQTTService:
         try:
             self.client.publish(config_topic, json.dumps(config_payload), retain=True)
             self.published_sensors.add(sensor_id)
-            print(f"Binary sensor configuré: {name}")
+            logger.debug(f"Binary sensor configuré: {name}")
             return True
         except Exception as e:
-            print(f"Erreur lors de la configuration du binary sensor {sensor_id}: {e}")
+            logger.error(f"Erreur lors de la configuration du binary sensor {sensor_id}: {e}")
             return False
     
     def buffer_sensor_value(self, sensor_id: str, value: Any):
@@ -360,7 +377,7 @@ class MQTTService:
             self.last_publish_time = current_time
             self.message_buffer.clear()
         except Exception as e:
-            print(f"Erreur lors de la publication groupée: {e}")
+            logger.error(f"Erreur lors de la publication groupée: {e}")
             success = False
             
         return success
@@ -376,7 +393,7 @@ class MQTTService:
             self.client.publish(state_topic, str(value))
             return True
         except Exception as e:
-            print(f"Erreur lors de la publication du capteur {sensor_id}: {e}")
+            logger.error(f"Erreur lors de la publication du capteur {sensor_id}: {e}")
             return False
     
     def publish_binary_sensor_state(self, sensor_id: str, state: bool):
@@ -391,7 +408,7 @@ class MQTTService:
             self.client.publish(state_topic, payload)
             return True
         except Exception as e:
-            print(f"Erreur lors de la publication du binary sensor {sensor_id}: {e}")
+            logger.error(f"Erreur lors de la publication du binary sensor {sensor_id}: {e}")
             return False
             
     def publish_status(self, status_data: Dict[str, Any]) -> bool:
@@ -405,7 +422,10 @@ class MQTTService:
                 - analysis_result: Résultats de l'analyse
         """
         if not self.is_connected:
-            print("⚠️  MQTT: Impossible de publier - pas connecté au broker")
+            now = time.monotonic()
+            if now - self._last_not_connected_log > 10.0:
+                self._last_not_connected_log = now
+                logger.warning("⚠️  MQTT: Impossible de publier - pas connecté au broker")
             return False
             
         # S'assurer que les nouveaux capteurs existent (auto-config paresseuse)
@@ -454,9 +474,49 @@ class MQTTService:
             self.client.publish(status_topic, status_json)
             return True
         except Exception as e:
-            print(f"Erreur lors de la publication du statut: {e}")
+            logger.error(f"Erreur lors de la publication du statut: {e}")
             return False
     
+    def publish_status_async(self, status_data: Dict[str, Any]) -> bool:
+        """Dépose un statut pour publication par le thread de publication MQTT, sans bloquer l'appelant.
+        Si la file est pleine (broker lent ou absent), le statut est abandonné: le suivant le remplacera.
+        """
+        self._start_status_publisher()
+        try:
+            self._status_queue.put_nowait(status_data)
+            return True
+        except queue.Full:
+            logger.debug("MQTT: file des statuts pleine, statut abandonné")
+            return False
+
+    def _start_status_publisher(self):
+        """Démarre le thread de publication des statuts s'il ne tourne pas déjà"""
+        with self._status_thread_lock:
+            if self._status_thread is not None and self._status_thread.is_alive():
+                return
+            self._status_thread = threading.Thread(target=self._status_publisher_loop, name='mqtt-status', daemon=True)
+            self._status_thread.start()
+
+    def _status_publisher_loop(self):
+        """Publie les statuts déposés par le thread d'analyse. Chaque statut est un instantané complet:
+        si plusieurs attendent (rafale d'échecs IA, broker lent), seul le plus récent est publié.
+        """
+        while True:
+            status_data = self._status_queue.get()
+            skipped = 0
+            while True:
+                try:
+                    status_data = self._status_queue.get_nowait()
+                    skipped += 1
+                except queue.Empty:
+                    break
+            if skipped:
+                logger.debug(f"MQTT: {skipped} statut(s) remplacé(s) par un plus récent avant publication")
+            try:
+                self.publish_status(status_data)
+            except Exception as e:
+                logger.error(f"Erreur lors de la publication du statut: {e}")
+
     def remove_sensor(self, sensor_id: str, sensor_type: str = "sensor"):
         """Supprime un capteur de Home Assistant ET nettoie les topics MQTT"""
         if not self.is_connected:
@@ -473,20 +533,20 @@ class MQTTService:
                 # Nettoyer le topic de state du binary sensor
                 state_topic = f"{self.topic_prefix}/binary_sensor/{sensor_id}/state"
                 self.client.publish(state_topic, "", retain=True)
-                print(f"🗑️ Nettoyage topic MQTT: {state_topic}")
+                logger.debug(f"🗑️ Nettoyage topic MQTT: {state_topic}")
             elif sensor_type == "sensor":
                 # Nettoyer le topic de state du sensor
                 state_topic = f"{self.topic_prefix}/sensor/{sensor_id}/state"
                 self.client.publish(state_topic, "", retain=True)
-                print(f"🗑️ Nettoyage topic MQTT: {state_topic}")
+                logger.debug(f"🗑️ Nettoyage topic MQTT: {state_topic}")
             
             if sensor_id in self.published_sensors:
                 self.published_sensors.remove(sensor_id)
             
-            print(f"✅ Capteur {sensor_id} supprimé (Home Assistant + topics MQTT)")
+            logger.info(f"✅ Capteur {sensor_id} supprimé (Home Assistant + topics MQTT)")
             return True
         except Exception as e:
-            print(f"Erreur lors de la suppression du capteur {sensor_id}: {e}")
+            logger.error(f"Erreur lors de la suppression du capteur {sensor_id}: {e}")
             return False
     
     def get_connection_status(self) -> Dict[str, Any]:
@@ -5,6 +5,9 @@ class IActionApp {
         this.isCapturing = false;
         this.detections = [];
         this.statusInterval = null;
+        this.statusSource = null;
+        this.statusRetryTimer = null;
+        this.statusRetryDelay = 1000;
         this.videoUpdateInterval = null;
         // Gestion du niveau de logs (UI + console)
         this.logLevels = { 'error': 0, 'warning': 1, 'info': 2, 'success': 2, 'debug': 3 };
@@ -125,27 +128,7 @@ class IActionApp {
         try {
             const response = await fetch('/api/capture_status');
             if (response.ok) {
-                const data = await response.json();
-                const wasCapturing = this.captureInProgress;
-                
-                if (data.is_capturing && !wasCapturing) {
-                    // Capture vient de démarrer
-                    this.isCapturing = true;
-                    this.captureInProgress = true;
-                    this.updateCaptureControls();
-                    this.showToggleButton();
-                    this.showCaptureLoading(false); // Masquer le spinner
-                    this.addLog('✅ Capture détectée - Interface mise à jour', 'success');
-                } else if (!data.is_capturing && wasCapturing) {
-                    // Capture vient de s'arrêter
-                    this.isCapturing = false;
-                    this.captureInProgress = false;
-                    this.updateCaptureControls();
-                    this.hideToggleButton();
-                    this.stopVideoStream();
-                    this.showCaptureLoading(false); // Masquer le spinner
-                    this.addLog('⚠️ Capture arrêtée - Interface mise à jour', 'info');
-                }
+                this.applyCaptureStatus(await response.json());
             }
         } catch (error) {
             // Erreur silencieuse pour éviter le spam
@@ -153,6 +136,29 @@ class IActionApp {
         }
     }
     
+    applyCaptureStatus(data) {
+        const wasCapturing = this.captureInProgress;
+        
+        if (data.is_capturing && !wasCapturing) {
+            // Capture vient de démarrer
+            this.isCapturing = true;
+            this.captureInProgress = true;
+            this.updateCaptureControls();
+            this.showToggleButton();
+            this.showCaptureLoading(false); // Masquer le spinner
+            this.addLog('✅ Capture détectée - Interface mise à jour', 'success');
+        } else if (!data.is_capturing && wasCapturing) {
+            // Capture vient de s'arrêter
+            this.isCapturing = false;
+            this.captureInProgress = false;
+            this.updateCaptureControls();
+            this.hideToggleButton();
+            this.stopVideoStream();
+            this.showCaptureLoading(false); // Masquer le spinner
+            this.addLog('⚠️ Capture arrêtée - Interface mise à jour', 'info');
+        }
+    }
+    
     async startCapture() {
         // Récupérer la configuration serveur (mode + RTSP)
         let captureMode = 'rtsp';
@@ -491,12 +497,82 @@ class IActionApp {
     }
     
     startStatusUpdates() {
-        // Mise à jour rapide pour réactivité en temps réel
+        // Flux SSE: le serveur pousse l'état uniquement lorsqu'il change
+        if (window.EventSource) {
+            this.openStatusSource();
+            // Fermer le flux en quittant la page pour libérer la connexion côté serveur
+            window.addEventListener('pagehide', () => this.closeStatusSource());
+            window.addEventListener('beforeunload', () => this.closeStatusSource());
+            // Page restaurée depuis le cache de navigation: rouvrir le flux
+            window.addEventListener('pageshow', (event) => {
+                if (event.persisted && !this.statusSource) {
+                    this.openStatusSource();
+                }
+            });
+            return;
+        }
+        // Repli: polling périodique si EventSource n'est pas disponible
+        this.startStatusPolling();
+    }
+    
+    openStatusSource() {
+        this.statusRetryTimer = null;
+        const source = new EventSource('/api/status/stream');
+        this.statusSource = source;
+        source.onopen = () => {
+            // Flux (r)établi: arrêter le polling temporaire
+            this.statusRetryDelay = 1000;
+            this.stopStatusPolling();
+        };
+        source.onmessage = (event) => {
+            try {
+                const data = JSON.parse(event.data);
+                this.updateAnalysisTimeIndicators(data);
+                this.applyCaptureStatus(data);
+            } catch (error) {
+                console.error('Erreur lors du traitement du statut:', error);
+            }
+        };
+        source.onerror = () => {
+            // Coupure (proxy, redémarrage du serveur): polling le temps que le flux revienne
+            this.startStatusPolling();
+            // Le navigateur se reconnecte seul, sauf s'il a fermé le flux: le rouvrir avec un délai croissant
+            if (source.readyState === EventSource.CLOSED && this.statusSource === source) {
+                this.statusSource = null;
+                const delay = this.statusRetryDelay;
+                this.statusRetryDelay = Math.min(delay * 2, 30000);
+                this.statusRetryTimer = setTimeout(() => this.openStatusSource(), delay);
+            }
+        };
+    }
+    
+    startStatusPolling() {
+        if (this.statusInterval) {
+            return;
+        }
         this.statusInterval = setInterval(() => {
             this.updateSensorValues();
         }, 1000); // 1 seconde pour meilleure réactivité
     }
     
+    stopStatusPolling() {
+        if (this.statusInterval) {
+            clearInterval(this.statusInterval);
+            this.statusInterval = null;
+        }
+    }
+    
+    closeStatusSource() {
+        if (this.statusRetryTimer) {
+            clearTimeout(this.statusRetryTimer);
+            this.statusRetryTimer = null;
+        }
+        if (this.statusSource) {
+            this.statusSource.close();
+            this.statusSource = null;
+        }
+    }
+    
     async updateSensorValues() {
         try {
             // Utiliser l'endpoint léger pour les métriques